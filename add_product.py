@@ -1,10 +1,51 @@
 # add_product.py - Add products to items.json by extracting name from Croma URL
+#
+# Usage:
+#   python add_product.py [URL [NAME]]               # one product (interactive without arguments)
+#   python add_product.py --bulk urls.txt             # many products; "-" reads the URLs from stdin
+#   python add_product.py --crawl LISTING_URL [...]   # every /p/<id> product linked from category/search pages
+#   add --dry-run to see what would be added without saving
+import html
 import json
 import re
 import sys
-from urllib.parse import urlparse, unquote
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse, unquote, urljoin
+
+import requests
+
+import item_store
+from croma_api import extract_product_id_from_url
+from item_registry import ItemRegistry
 
 ITEMS_FILE = "items.json"
+BULK_NAME_WORKERS = 8  # Product pages fetched at once to name products whose URL has no readable slug
+FETCH_TIMEOUT = 15
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+PRODUCT_LINK = re.compile(r'''href=["']([^"']*/p/\d+[^"']*)["']''')
+DEFAULT_AVAILABLE_INDICATORS = ["Buy Now", "Add to Cart", "Add to Bag"]
+DEFAULT_UNAVAILABLE_INDICATORS = [
+    "Notify Me",
+    "Out of Stock",
+    "Currently unavailable",
+    "Not Available",
+    "Not Available for your pincode",
+    "Not Available at pincode"
+]
+if item_store.ITEMS_BACKEND == "sqlite":
+    ITEMS_FILE = item_store.DB_FILE
+registry = None  # Item store, opened on first use (see get_registry) so importing this module opens nothing
+
+
+def get_registry():
+    """The configured item store (SQLite or items.json), opened on first use"""
+    global registry
+    if registry is None:
+        if item_store.ITEMS_BACKEND == "sqlite":
+            registry = item_store.SqliteRegistry(item_store.DB_FILE)
+        else:
+            registry = ItemRegistry(ITEMS_FILE)
+    return registry
 
 def extract_product_name_from_url(url):
     """Extract product name from Croma URL"""
@@ -43,22 +84,20 @@ def extract_product_name_from_url(url):
 
 
 def load_items():
-    """Load existing items from items.json"""
+    """Load existing items from items.json (re-read only if the file changed since the last load)"""
     try:
-        with open(ITEMS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except FileNotFoundError:
-        return []
+        get_registry().refresh()
     except json.JSONDecodeError:
         print(f"Error: {ITEMS_FILE} is corrupted. Please fix it manually.")
         return None
+    return list(get_registry().items)
 
 
 def save_items(items):
-    """Save items to items.json"""
+    """Save items to items.json (temp file + rename, so a crash can't leave it half-written)"""
     try:
-        with open(ITEMS_FILE, "w", encoding="utf-8") as f:
-            json.dump(items, f, indent=2, ensure_ascii=False)
+        item_store.write_json_atomic(ITEMS_FILE, items)
+        get_registry().saved(items)
         return True
     except Exception as e:
         print(f"Error saving items: {e}")
@@ -67,24 +106,27 @@ def save_items(items):
 
 def check_duplicate(url):
     """Check if URL already exists in items.json"""
-    items = load_items()
-    if items is None:
-        return None, None
-    
-    for item in items:
-        if item.get("url") == url:
-            return True, item.get("name")
-    
+    if item_store.ITEMS_BACKEND != "sqlite":  # SQLite answers straight from its URL index
+        try:
+            get_registry().refresh()
+        except json.JSONDecodeError:
+            print(f"Error: {ITEMS_FILE} is corrupted. Please fix it manually.")
+            return None, None
+
+    item = get_registry().get(url)  # O(1) lookup in the URL index
+    if item is not None:
+        return True, item.get("name")
+
     return False, None
 
 
-def add_product(url, custom_name=None, ask_new_link=False):
-    """Add a new product to items.json"""
+def add_product(url, custom_name=None, ask_new_link=False, dry_run=False):
+    """Add a new product to items.json (dry_run: only show what would be added)"""
     # Validate URL
     if not url.startswith("http"):
         print("❌ Invalid URL. Please provide a full URL starting with http:// or https://")
         if ask_new_link:
-            return ask_for_new_link()
+            return ask_for_new_link(dry_run)
         return False
     
     if "croma.com" not in url:
@@ -103,17 +145,12 @@ def add_product(url, custom_name=None, ask_new_link=False):
         
         if ask_new_link:
             print("\nPlease provide a new/different link:")
-            return ask_for_new_link()
+            return ask_for_new_link(dry_run)
         else:
             # Command line mode - just exit
             print("\n💡 Tip: Use a different product URL or remove the existing one from items.json")
             return False
     
-    # Load items (we know it's not a duplicate now)
-    items = load_items()
-    if items is None:
-        return False
-    
     # Extract product name
     if custom_name:
         product_name = custom_name
@@ -126,37 +163,159 @@ def add_product(url, custom_name=None, ask_new_link=False):
                 return False
     
     # Create new product entry
-    new_product = {
-        "name": product_name,
-        "url": url,
-        "check_type": "text",
-        "available_indicators": ["Buy Now", "Add to Cart", "Add to Bag"],
-        "unavailable_indicators": [
-            "Notify Me", 
-            "Out of Stock", 
-            "Currently unavailable", 
-            "Not Available", 
-            "Not Available for your pincode", 
-            "Not Available at pincode"
-        ]
-    }
-    
-    # Add to items list
-    items.append(new_product)
+    new_product = new_product_entry(url, product_name)
+    if dry_run:
+        print(f"  ➕ {product_name}")
+        print("ℹ️  Dry run - nothing saved")
+        return True
     
-    # Save to file
-    if save_items(items):
+    # Save: one row insert for SQLite, whole-file rewrite for items.json
+    if save_new_product(new_product):
         print(f"✅ Product added successfully!")
         print(f"   Name: {product_name}")
         print(f"   URL: {url}")
-        print(f"\n📝 {len(items)} product(s) in {ITEMS_FILE}")
+        print(f"\n📝 {len(get_registry())} product(s) in {ITEMS_FILE}")
         return True
     else:
         print("❌ Failed to save product.")
         return False
 
 
-def ask_for_new_link():
+def save_new_product(new_product):
+    """Append one product to the configured item store"""
+    if item_store.ITEMS_BACKEND == "sqlite":
+        try:
+            get_registry().insert(new_product)
+            return True
+        except Exception as e:
+            print(f"Error saving items: {e}")
+            return False
+
+    # Items are already in memory from the duplicate check (not re-read unless the file changed)
+    items = load_items()
+    if items is None:
+        return False
+    items.append(new_product)
+    return save_items(items)
+
+
+def new_product_entry(url, name):
+    """items.json entry for a product with the default indicators"""
+    return {
+        "name": name,
+        "url": url,
+        "check_type": "text",
+        "available_indicators": list(DEFAULT_AVAILABLE_INDICATORS),
+        "unavailable_indicators": list(DEFAULT_UNAVAILABLE_INDICATORS),
+    }
+
+
+def product_key(url):
+    """What makes two URLs the same product: the Croma product id, else the URL without query/fragment"""
+    product_id = extract_product_id_from_url(url)
+    if product_id:
+        return "id:" + product_id
+    return urlparse(url)._replace(query="", fragment="").geturl().rstrip("/")
+
+
+def read_url_list(source):
+    """(url, name or None) pairs from a file or "-" (stdin): one URL per line, optionally followed by a name"""
+    f = sys.stdin if source == "-" else open(source, "r", encoding="utf-8")
+    try:
+        entries = []
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            url, _, name = line.partition(" ")
+            entries.append((url, name.strip() or None))
+        return entries
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def crawl_listing(listing_url, session):
+    """Product URLs (/p/<id> links) found on a Croma category or search page, without query strings"""
+    response = session.get(listing_url, timeout=FETCH_TIMEOUT)
+    response.raise_for_status()
+    urls = {}  # Insertion-ordered set
+    for href in PRODUCT_LINK.findall(response.text):
+        urls[urljoin(listing_url, html.unescape(href)).split("#")[0].split("?")[0]] = None
+    return list(urls)
+
+
+def fetch_product_name(url, session):
+    """Product name from the page's <title> (for URLs without a readable slug); None on failure"""
+    try:
+        response = session.get(url, timeout=FETCH_TIMEOUT)
+        response.raise_for_status()
+    except requests.RequestException:
+        return None
+    match = re.search(r"<title[^>]*>(.*?)</title>", response.text, re.S | re.I)
+    if not match:
+        return None
+    title = " ".join(html.unescape(match.group(1)).split())
+    return re.split(r"\s+[|:-]\s+Croma", title)[0] or None
+
+
+def bulk_add(entries, session, dry_run=False):
+    """Add many (url, name) entries at once: one duplicate pass, concurrent naming, one write"""
+    items = load_items()
+    if items is None:
+        return False
+
+    existing = {product_key(item["url"]) for item in items}
+    batch = set()
+    new = []
+    already = 0
+    repeated = 0
+    for url, name in entries:
+        if not url.startswith("http"):
+            print(f"❌ Skipping invalid URL: {url}")
+            continue
+        key = product_key(url)
+        if key in existing:
+            already += 1
+        elif key in batch:
+            repeated += 1
+        else:
+            batch.add(key)
+            new.append([url, name or extract_product_name_from_url(url)])
+
+    # URLs without a readable slug: take the name from the product page, several pages at a time
+    unnamed = [entry for entry in new if not entry[1]]
+    if unnamed:
+        print(f"🔎 Fetching {len(unnamed)} product page(s) for their names...")
+        with ThreadPoolExecutor(max_workers=BULK_NAME_WORKERS) as pool:
+            names = pool.map(lambda entry: fetch_product_name(entry[0], session), unnamed)
+            for entry, name in zip(unnamed, names):
+                entry[1] = name or f"Croma product {extract_product_id_from_url(entry[0]) or entry[0]}"
+
+    products = [new_product_entry(url, name) for url, name in new]
+    for product in products:
+        print(f"  ➕ {product['name']}")
+    print(f"\n📦 {len(products)} new, {already} already in {ITEMS_FILE}, {repeated} repeated in the input")
+    if dry_run:
+        print("ℹ️  Dry run - nothing saved")
+        return True
+    if not products:
+        return True
+
+    # One atomic file write (or one SQLite transaction) for the whole batch
+    if item_store.ITEMS_BACKEND == "sqlite":
+        try:
+            get_registry().insert_many(products)
+        except Exception as e:
+            print(f"Error saving items: {e}")
+            return False
+    elif not save_items(items + products):
+        return False
+    print(f"✅ Added {len(products)} product(s) - {len(get_registry())} in {ITEMS_FILE}")
+    return True
+
+
+def ask_for_new_link(dry_run=False):
     """Ask user for a new link in interactive mode"""
     print("\n" + "-" * 60)
     new_url = input("Enter new Croma product URL (or 'q' to quit): ").strip()
@@ -167,7 +326,7 @@ def ask_for_new_link():
     
     if not new_url:
         print("❌ URL cannot be empty. Please try again.")
-        return ask_for_new_link()
+        return ask_for_new_link(dry_run)
     
     # Try to auto-detect name
     auto_name = extract_product_name_from_url(new_url)
@@ -175,12 +334,12 @@ def ask_for_new_link():
         print(f"\n📦 Auto-detected product name: {auto_name}")
         use_auto = input("Use this name? (y/n): ").lower().strip()
         if use_auto == 'y':
-            return add_product(new_url, auto_name, ask_new_link=True)
+            return add_product(new_url, auto_name, ask_new_link=True, dry_run=dry_run)
         else:
             custom_name = input("Enter custom name: ").strip()
-            return add_product(new_url, custom_name if custom_name else None, ask_new_link=True)
+            return add_product(new_url, custom_name if custom_name else None, ask_new_link=True, dry_run=dry_run)
     else:
-        return add_product(new_url, None, ask_new_link=True)
+        return add_product(new_url, None, ask_new_link=True, dry_run=dry_run)
 
 
 if __name__ == "__main__":
@@ -189,11 +348,38 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
     
-    if len(sys.argv) > 1:
+    args = sys.argv[1:]
+    dry_run = "--dry-run" in args
+    if dry_run:
+        args.remove("--dry-run")
+
+    if args and args[0] in ("--bulk", "--crawl"):
+        session = requests.Session()
+        session.headers["User-Agent"] = USER_AGENT
+        if args[0] == "--bulk":
+            if len(args) < 2:
+                print("Usage: python add_product.py --bulk urls.txt|-")
+                sys.exit(1)
+            entries = read_url_list(args[1])
+        else:
+            entries = []
+            for listing_url in args[1:]:
+                try:
+                    found = crawl_listing(listing_url, session)
+                except requests.RequestException as e:
+                    print(f"❌ Could not fetch {listing_url}: {e}")
+                    continue
+                print(f"🔗 {len(found)} product link(s) on {listing_url}")
+                entries.extend((url, None) for url in found)
+        ok = bulk_add(entries, session, dry_run)
+        session.close()
+        sys.exit(0 if ok else 1)
+
+    if args:
         # URL provided as command line argument
-        url = sys.argv[1]
-        custom_name = sys.argv[2] if len(sys.argv) > 2 else None
-        add_product(url, custom_name, ask_new_link=False)
+        url = args[0]
+        custom_name = args[1] if len(args) > 1 else None
+        add_product(url, custom_name, ask_new_link=False, dry_run=dry_run)
     else:
         # Interactive mode
         print("Enter Croma product URL:")
@@ -209,10 +395,10 @@ if __name__ == "__main__":
             print(f"\n📦 Auto-detected product name: {auto_name}")
             use_auto = input("Use this name? (y/n): ").lower().strip()
             if use_auto == 'y':
-                add_product(url, auto_name, ask_new_link=True)
+                add_product(url, auto_name, ask_new_link=True, dry_run=dry_run)
             else:
                 custom_name = input("Enter custom name: ").strip()
-                add_product(url, custom_name if custom_name else None, ask_new_link=True)
+                add_product(url, custom_name if custom_name else None, ask_new_link=True, dry_run=dry_run)
         else:
-            add_product(url, None, ask_new_link=True)
+            add_product(url, None, ask_new_link=True, dry_run=dry_run)
 
@@ -0,0 +1,252 @@
+# benchmark.py - Time check_once() against local Croma-like pages (no network needed)
+#
+# Usage:
+#   python benchmark.py [--checker simple|selenium] [--items 10,100,1000] [--sweeps 2] [--indicators N]
+#                       [--latency-ms 50] [--slow-ms 1000] [--render-ms 1500] [--page-kb 200] [--json FILE]
+#
+# Pages come from croma_site_stub.py (run as a separate process so its CPU/memory isn't counted) and
+# alerts go to fake_telegram_api.py. Sweep 1 of each size starts with an empty page cache; later
+# sweeps show the cost of re-checking unchanged pages.
+import contextlib
+import io
+import json
+import math
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import croma_site_stub
+import proc_stats
+from fake_telegram_api import start_fake_server
+from item_store import write_json_atomic
+
+# ====== CONFIG ======
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_SIZES = [10, 100, 1000]
+DEFAULT_SWEEPS = 2
+FIRST_PRODUCT_ID = 100000
+RSS_SAMPLE_SECONDS = 0.05
+
+# Same indicator lists as the iPhone entries in items.json
+AVAILABLE_INDICATORS = ["Buy Now", "Add to Cart", "Add to Bag"]
+UNAVAILABLE_INDICATORS = ["Notify Me", "Out of Stock", "Currently unavailable", "Not Available",
+                          "Not Available for your pincode", "Not Available at pincode"]
+
+
+def start_site(options):
+    """Run croma_site_stub.py in its own process; returns (process, base_url)"""
+    command = [sys.executable, os.path.join(HERE, "croma_site_stub.py"), "0"]
+    for name, value in options.items():
+        command += ["--" + name.replace("_", "-"), str(value)]
+    process = subprocess.Popen(command, cwd=HERE, stdout=subprocess.PIPE, text=True)
+    match = re.search(r"http://\S+", process.stdout.readline())
+    if not match:
+        process.kill()
+        raise RuntimeError("croma_site_stub.py did not start")
+    return process, match.group(0)
+
+
+def make_items(base_url, count, extra_indicators=0):
+    """count text-check items spread evenly over the stub's page variants"""
+    # Phrases that never occur on the pages, to see how the indicator count affects matching
+    extra = [f"discontinued bench variant {n}" for n in range(extra_indicators)]
+    items = []
+    for product_id in range(FIRST_PRODUCT_ID, FIRST_PRODUCT_ID + count):
+        items.append({
+            "name": f"Bench Phone {product_id}",
+            "url": f"{base_url}/bench-phone-{product_id}/p/{product_id}",
+            "check_type": "text",
+            "available_indicators": AVAILABLE_INDICATORS,
+            "unavailable_indicators": UNAVAILABLE_INDICATORS + extra,
+        })
+    return items
+
+
+def expected_verdict(item):
+    """(delivery_unavailable, avail) the checker should report for this item's page"""
+    product_id = item["url"].rsplit("/", 1)[1]
+    return croma_site_stub.EXPECTED[croma_site_stub.variant_of(product_id)]
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile (None for no values)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+
+class PeakMemory(threading.Thread):
+    """Samples the memory of this process and its children (e.g. Chrome) and keeps the highest value"""
+
+    def __init__(self, skip):
+        super().__init__(daemon=True)
+        self.skip = skip
+        self.peak = 0.0
+        self.done = threading.Event()
+
+    def run(self):
+        while not self.done.is_set():
+            rss = proc_stats.process_tree_rss_mb(os.getpid(), self.skip)
+            if rss is not None:
+                self.peak = max(self.peak, rss)
+            self.done.wait(RSS_SAMPLE_SECONDS)
+
+    def stop(self):
+        self.done.set()
+        self.join()
+        return self.peak
+
+
+def instrument(checker, timings, reported):
+    """Time every check_item() call and record every reported result"""
+    check_item = checker.check_item
+    report_result = checker.report_result
+
+    def timed_check_item(*args):
+        started = time.perf_counter()
+        try:
+            return check_item(*args)
+        finally:
+            timings.append(time.perf_counter() - started)
+
+    def recording_report_result(item, result):
+        reported[item["url"]] = result
+        report_result(item, result)
+
+    checker.check_item = timed_check_item
+    checker.report_result = recording_report_result
+
+
+def run_sweep(checker, items, skip, timings, reported):
+    """One check_once() over items; returns a row of measurements"""
+    timings.clear()
+    reported.clear()
+    memory = PeakMemory(skip)
+    memory.start()
+    cpu_before = proc_stats.process_tree_cpu_seconds(os.getpid(), skip)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):  # The monitor's per-product output
+        checker.check_once()
+    wall = time.perf_counter() - started
+    cpu_after = proc_stats.process_tree_cpu_seconds(os.getpid(), skip)
+    peak_mb = memory.stop()
+
+    correct = 0
+    for item in items:
+        result = reported.get(item["url"])
+        if result and not result.get("error"):
+            correct += (result["delivery_unavailable"], result["avail"]) == expected_verdict(item)
+    p50 = percentile(timings, 50)
+    p95 = percentile(timings, 95)
+    return {
+        "items": len(items),
+        "wall_s": round(wall, 3),
+        "page_p50_ms": None if p50 is None else round(p50 * 1000, 1),
+        "page_p95_ms": None if p95 is None else round(p95 * 1000, 1),
+        "cpu_s": None if cpu_before is None or cpu_after is None else round(cpu_after - cpu_before, 2),
+        "peak_rss_mb": round(peak_mb, 1),
+        "correct": correct,
+    }
+
+
+def print_row(row):
+    ms = lambda value: "-" if value is None else f"{value:.0f}"
+    cpu = "-" if row["cpu_s"] is None else f"{row['cpu_s']:.1f}"
+    print(f"{row['items']:>6} {row['sweep']:>6} {row['wall_s']:>9.2f} {ms(row['page_p50_ms']):>8} "
+          f"{ms(row['page_p95_ms']):>8} {cpu:>7} {row['peak_rss_mb']:>8.0f}   {row['correct']}/{row['items']}",
+          flush=True)
+
+
+def parse_args(args):
+    """Benchmark options from the command line (see Usage above)"""
+    site_options, args = croma_site_stub.parse_options(args)
+    options = {"checker": "simple", "sizes": DEFAULT_SIZES, "sweeps": DEFAULT_SWEEPS, "indicators": 0,
+               "json": None, "site": site_options}
+    for flag in ("--checker", "--items", "--sweeps", "--indicators", "--json"):
+        if flag in args:
+            i = args.index(flag)
+            value = args[i + 1]
+            del args[i:i + 2]
+            if flag == "--items":
+                options["sizes"] = [int(n) for n in value.split(",")]
+            elif flag in ("--sweeps", "--indicators"):
+                options[flag[2:]] = int(value)
+            else:
+                options[flag[2:]] = value
+    if options["checker"] not in ("simple", "selenium"):
+        raise SystemExit("--checker must be simple or selenium")
+    return options
+
+
+def main(args):
+    options = parse_args(args)
+    json_path = os.path.abspath(options["json"]) if options["json"] else None
+    site, base_url = start_site(options["site"])
+    telegram = start_fake_server()
+    workdir = tempfile.mkdtemp(prefix="stock-bench-")
+    rows = []
+    try:
+        # The monitor keeps items.json, state and caches in the working directory
+        os.environ["TELEGRAM_API_BASE"] = telegram.base_url
+        os.environ["ITEMS_BACKEND"] = "json"
+        sys.path.insert(0, HERE)
+        os.chdir(workdir)
+        write_json_atomic("items.json", [])
+        if options["checker"] == "selenium":
+            import stock_alert_selenium as checker
+        else:
+            import stock_alert_simple as checker
+        import page_cache
+        import stock_core
+
+        if options["checker"] == "selenium" and not checker.start_workers():
+            raise SystemExit("Cannot benchmark: ChromeDriver not available.")
+        if options["checker"] == "simple":
+            checker.start_parse_pool()
+
+        timings = []
+        reported = {}
+        instrument(checker, timings, reported)
+        skip = {site.pid}
+
+        print(f"📊 {options['checker']} checker, {base_url}, {options['site'] or 'default timings'}, "
+              f"{options['indicators']} extra indicator(s)")
+        print(f"{'items':>6} {'sweep':>6} {'wall (s)':>9} {'p50 ms':>8} {'p95 ms':>8} {'CPU s':>7} {'RSS MB':>8}   correct")
+        for size in options["sizes"]:
+            items = make_items(base_url, size, options["indicators"])
+            write_json_atomic("items.json", items)
+            stock_core.notified.clear()
+            stock_core.delivery_status.clear()
+            page_cache.cache.clear()
+            for sweep in range(1, options["sweeps"] + 1):
+                row = run_sweep(checker, items, skip, timings, reported)
+                row["sweep"] = sweep
+                rows.append(row)
+                print_row(row)
+
+        if options["checker"] == "selenium":
+            checker.stop_workers()
+        else:
+            checker.stop_parse_pool()
+        stock_core.telegram.stop(timeout=5)
+    finally:
+        os.chdir(HERE)
+        site.terminate()
+        telegram.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if json_path:
+        with open(json_path, "w", encoding="utf-8") as f:
+            json.dump({"checker": options["checker"], "site": options["site"], "indicators": options["indicators"],
+                       "rows": rows}, f, indent=2)
+        print(f"💾 Results written to {json_path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,397 @@
+# cluster.py - Split the product list over several checker processes/hosts by consistent hashing of URLs
+#
+# Usage:
+#   python cluster.py coordinator [--host 127.0.0.1] [--port 8770]
+#   python cluster.py worker [--coordinator 127.0.0.1:8770] [--checker simple|selenium] [--id NAME]
+#
+# The coordinator reads items.json, gives each worker its share of the products, and is the only process
+# that keeps alert state and sends Telegram messages. Workers only check pages and send back results.
+# When a worker joins, disconnects or stops sending heartbeats its share is re-hashed over the others
+# (consistent hashing: only the products of the joining/leaving worker move).
+# Messages are JSON lines over TCP; set CLUSTER_TOKEN to the same value everywhere to reject strangers.
+import bisect
+import hashlib
+import json
+import os
+import queue
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import scheduler
+from stock_core import (
+    CHECK_INTERVAL_MIN, load_items, registry, report_result, restore_state, flush_state, stop_notifier,
+)
+
+# ====== CONFIG ======
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8770
+CLUSTER_TOKEN = os.environ.get("CLUSTER_TOKEN", "")
+VIRTUAL_NODES = 64  # Points per worker on the hash ring (evens out the shares)
+HEARTBEAT_SECONDS = 5  # Workers send a heartbeat this often...
+HEARTBEAT_TIMEOUT = 20  # ...and are dropped after this long without any message
+RECONNECT_SECONDS = 5
+
+
+def send_message(sock_file, lock, message):
+    """Write one JSON line (lock serializes writers sharing the connection)"""
+    data = (json.dumps(message, ensure_ascii=False, default=str) + "\n").encode("utf-8")
+    with lock:
+        sock_file.write(data)
+        sock_file.flush()
+
+
+class HashRing:
+    """Consistent hashing of keys (product URLs) onto nodes (worker ids)"""
+
+    def __init__(self, nodes=(), replicas=VIRTUAL_NODES):
+        points = sorted((self.point(f"{node}#{i}"), node) for node in nodes for i in range(replicas))
+        self.keys = [p for p, _ in points]
+        self.nodes = [node for _, node in points]
+
+    @staticmethod
+    def point(key):
+        return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+    def node_for(self, key):
+        """The node owning key (None if the ring is empty)"""
+        if not self.keys:
+            return None
+        return self.nodes[bisect.bisect(self.keys, self.point(key)) % len(self.keys)]
+
+
+# ---- coordinator ----
+
+class WorkerLink:
+    """The coordinator's side of one connected worker"""
+
+    def __init__(self, worker_id, wfile, connection):
+        self.id = worker_id
+        self.wfile = wfile
+        self.connection = connection
+        self.lock = threading.Lock()
+        self.last_seen = time.time()
+        self.assigned = None  # Item list last sent to this worker
+
+    def send(self, message):
+        send_message(self.wfile, self.lock, message)
+
+    def close(self):
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+class CoordinatorHandler(socketserver.StreamRequestHandler):
+    """Reads one worker's messages and hands them to the coordinator's main loop"""
+
+    def handle(self):
+        events = self.server.events
+        try:
+            hello = json.loads(self.rfile.readline() or b"{}")
+        except json.JSONDecodeError:
+            return
+        if hello.get("type") != "hello" or not hello.get("worker"):
+            return
+        if CLUSTER_TOKEN and hello.get("token") != CLUSTER_TOKEN:
+            send_message(self.wfile, threading.Lock(), {"type": "error", "error": "bad token"})
+            return
+
+        worker = WorkerLink(str(hello["worker"]), self.wfile, self.connection)
+        events.put(("join", worker, None))
+        try:
+            for line in self.rfile:
+                try:
+                    message = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                worker.last_seen = time.time()
+                if message.get("type") == "result":
+                    events.put(("result", worker, message))
+        except OSError:
+            pass
+        finally:
+            events.put(("leave", worker, None))
+
+
+class CoordinatorServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address):
+        super().__init__(address, CoordinatorHandler)
+        self.events = queue.Queue()  # ("join" | "leave" | "result", WorkerLink, message)
+
+
+class Coordinator:
+    """Owns the item list, the worker ring and all alert state"""
+
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.server = CoordinatorServer((host, port))
+        self.workers = {}  # worker id -> WorkerLink
+        self.owner = {}  # url -> worker id
+        self.items = []
+
+    def rebalance(self, reason):
+        """Hash every product onto the current workers and send each worker its new share if it changed"""
+        ring = HashRing(sorted(self.workers))
+        shares = {worker_id: [] for worker_id in self.workers}
+        self.owner = {}
+        for item in self.items:
+            worker_id = ring.node_for(item["url"])
+            if worker_id is not None:
+                shares[worker_id].append(item)
+                self.owner[item["url"]] = worker_id
+
+        moved = 0
+        for worker_id, share in shares.items():
+            worker = self.workers[worker_id]
+            if share == worker.assigned:
+                continue
+            before = {item["url"] for item in worker.assigned or []}
+            moved += len({item["url"] for item in share} - before)
+            try:
+                worker.send({"type": "assign", "items": share})
+                worker.assigned = share
+            except OSError:
+                worker.close()  # Its handler reports "leave" and we rebalance again
+        if moved or reason != "items":
+            counts = ", ".join(f"{worker_id}: {len(share)}" for worker_id, share in sorted(shares.items()))
+            print(f"🔀 Rebalanced ({reason}): {moved} product(s) moved - {counts or 'no workers'}")
+        if self.items and not self.workers:
+            print(f"⚠️  No workers connected - {len(self.items)} product(s) are not being checked")
+
+    def handle(self, kind, worker, message):
+        """Apply one event from a connection handler (main thread only)"""
+        if kind == "join":
+            old = self.workers.get(worker.id)
+            if old is not None:
+                old.close()
+            self.workers[worker.id] = worker
+            print(f"🤝 Worker {worker.id} joined ({len(self.workers)} connected)")
+            self.rebalance(f"{worker.id} joined")
+            return False
+        if kind == "leave":
+            if self.workers.get(worker.id) is worker:  # Not already replaced by a reconnect
+                del self.workers[worker.id]
+                print(f"👋 Worker {worker.id} left ({len(self.workers)} connected)")
+                self.rebalance(f"{worker.id} left")
+            return False
+
+        url = message.get("url")
+        if self.owner.get(url) != worker.id:
+            return False  # Late result from before a rebalance; the new owner reports this product
+        item = registry.get(url)
+        if item is None:
+            return False
+        report_result(item, message.get("result") or {"error": "empty result"})
+        return True
+
+    def drop_silent_workers(self):
+        """Disconnect workers that stopped sending heartbeats (their handlers then report "leave")"""
+        now = time.time()
+        for worker in list(self.workers.values()):
+            if now - worker.last_seen > HEARTBEAT_TIMEOUT:
+                print(f"💀 Worker {worker.id}: no heartbeat for {now - worker.last_seen:.0f}s")
+                del self.workers[worker.id]
+                worker.close()
+                self.rebalance(f"{worker.id} timed out")
+
+    def run(self):
+        threading.Thread(target=self.server.serve_forever, name="coordinator", daemon=True).start()
+        host, port = self.server.server_address
+        print(f"✅ Coordinator listening on {host}:{port}")
+        while True:
+            items = load_items()
+            if items is not self.items:  # Cheap identity check: the registry returns the same list until it reloads
+                self.items = items
+                self.rebalance("items")
+            self.drop_silent_workers()
+
+            reported = 0
+            try:
+                event = self.server.events.get(timeout=1.0)
+                while True:
+                    reported += self.handle(*event)
+                    event = self.server.events.get_nowait()
+            except queue.Empty:
+                pass
+            if reported:
+                flush_state()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+# ---- worker ----
+
+class SimpleBackend:
+    """Checks products with stock_alert_simple's pooled HTTP session"""
+
+    def __init__(self):
+        import stock_alert_simple
+        self.checker = stock_alert_simple
+        stock_alert_simple.start_parse_pool()
+        self.pool = ThreadPoolExecutor(max_workers=stock_alert_simple.MAX_WORKERS)
+        self.in_flight = {}
+
+    def submit(self, items):
+        self.in_flight.update(self.checker.submit_due(self.pool, items))
+
+    def collect(self, timeout):
+        """(item, result) pairs finished within timeout"""
+        if not self.in_flight:
+            time.sleep(timeout)
+            return []
+        done, _ = wait(self.in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        finished = []
+        for future in done:
+            batch = self.in_flight.pop(future)
+            results = future.result()
+            finished.extend((item, results.get(item["url"], {"error": "no result"})) for item in batch)
+        return finished
+
+
+class SeleniumBackend:
+    """Checks products with stock_alert_selenium's Chrome worker pool"""
+
+    def __init__(self):
+        import stock_alert_selenium
+        self.checker = stock_alert_selenium
+        if not stock_alert_selenium.start_workers():
+            raise SystemExit("Cannot start: ChromeDriver not available.")
+        self.ready = []
+
+    def submit(self, items):
+        api_items = [item for item in items if item.get("check_type") == "api"]
+        for item in items:
+            if item.get("check_type") != "api":
+                self.checker.tasks.put(item)
+        api_results = self.checker.croma_api.check_items(api_items)
+        self.ready.extend((item, api_results[item["url"]]) for item in api_items)
+
+    def collect(self, timeout):
+        finished, self.ready = self.ready, []
+        try:
+            finished.append(self.checker.results.get(timeout=0 if finished else timeout))
+            while True:
+                finished.append(self.checker.results.get_nowait())
+        except queue.Empty:
+            pass
+        return finished
+
+
+def read_messages(rfile, inbox):
+    """Reader thread: coordinator messages -> inbox; None when the connection closes"""
+    try:
+        for line in rfile:
+            try:
+                inbox.put(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    except OSError:
+        pass
+    inbox.put(None)
+
+
+def serve_coordinator(sock, backend, worker_id):
+    """Check the products assigned over one connection until it closes"""
+    rfile = sock.makefile("rb")
+    wfile = sock.makefile("wb")
+    lock = threading.Lock()
+    inbox = queue.Queue()
+    send_message(wfile, lock, {"type": "hello", "worker": worker_id, "token": CLUSTER_TOKEN})
+    threading.Thread(target=read_messages, args=(rfile, inbox), daemon=True).start()
+
+    plan = scheduler.AdaptiveScheduler(CHECK_INTERVAL_MIN * 60)
+    last_heartbeat = 0
+    while True:
+        try:
+            while True:
+                message = inbox.get_nowait()
+                if message is None:
+                    return
+                if message.get("type") == "assign":
+                    plan.sync(message["items"])
+                    print(f"📋 Assigned {len(message['items'])} product(s)")
+                elif message.get("type") == "error":
+                    print(f"❌ Coordinator refused us: {message.get('error')}")
+                    return
+        except queue.Empty:
+            pass
+
+        due = plan.pop_due()
+        if due:
+            backend.submit(due)
+        next_due = plan.next_due()
+        timeout = 1.0 if next_due is None else min(1.0, max(0.05, next_due - time.time()))
+        for item, result in backend.collect(timeout):
+            if plan.complete(item, result) is None:
+                continue  # No longer ours
+            send_message(wfile, lock, {"type": "result", "url": item["url"], "result": result})
+
+        if time.time() - last_heartbeat >= HEARTBEAT_SECONDS:
+            send_message(wfile, lock, {"type": "heartbeat", "assigned": len(plan.entries),
+                                       "running": plan.running()})
+            last_heartbeat = time.time()
+
+
+def run_worker(address, checker="simple", worker_id=None):
+    """Connect to the coordinator (reconnecting as needed) and check what it assigns"""
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+    backend = SeleniumBackend() if checker == "selenium" else SimpleBackend()
+    print(f"✅ Worker {worker_id} ({checker} checker)")
+    while True:
+        try:
+            sock = socket.create_connection(address, timeout=10)
+        except OSError as e:
+            print(f"⚠️  Coordinator {address[0]}:{address[1]} unreachable ({e}) - retrying in {RECONNECT_SECONDS}s")
+            time.sleep(RECONNECT_SECONDS)
+            continue
+        sock.settimeout(None)
+        print(f"🔌 Connected to coordinator {address[0]}:{address[1]}")
+        try:
+            serve_coordinator(sock, backend, worker_id)
+        except OSError as e:
+            print(f"⚠️  Connection lost: {e}")
+        finally:
+            sock.close()
+        print(f"🔌 Disconnected - reconnecting in {RECONNECT_SECONDS}s")
+        time.sleep(RECONNECT_SECONDS)
+
+
+def option(args, flag, default):
+    if flag in args:
+        return args[args.index(flag) + 1]
+    return default
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if not args or args[0] not in ("coordinator", "worker"):
+        print("Usage: python cluster.py coordinator [--host H] [--port P]")
+        print("       python cluster.py worker [--coordinator H:P] [--checker simple|selenium] [--id NAME]")
+        sys.exit(1)
+
+    if args[0] == "coordinator":
+        coordinator = Coordinator(option(args, "--host", DEFAULT_HOST), int(option(args, "--port", DEFAULT_PORT)))
+        restore_state()
+        try:
+            coordinator.run()
+        except KeyboardInterrupt:
+            print("\nStopping coordinator...")
+            coordinator.stop()
+            flush_state()
+            stop_notifier()
+            print("Done!")
+    else:
+        host, _, port = option(args, "--coordinator", f"{DEFAULT_HOST}:{DEFAULT_PORT}").rpartition(":")
+        try:
+            run_worker((host, int(port)), option(args, "--checker", "simple"), option(args, "--id", None))
+        except KeyboardInterrupt:
+            print("\nStopping worker...")
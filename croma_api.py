@@ -0,0 +1,202 @@
+# croma_api.py - check_type "api": stock + pincode serviceability from Croma's JSON endpoint (no page rendering)
+import os
+import re
+import time
+from urllib.parse import urlparse
+
+import requests
+
+# ====== CONFIG ======
+# Override with CROMA_API_BASE=http://127.0.0.1:8765 to use croma_api_stub.py
+API_BASE = os.environ.get("CROMA_API_BASE", "https://api.croma.com")
+SERVICEABILITY_PATH = "/inventory/oms/v2/tms/details-pwa/"
+API_BATCH_SIZE = 20  # Product ids per request (one promise line each)
+API_TIMEOUT = 15
+PINCODE = os.environ.get("CROMA_PINCODE", "400049")  # Delivery pincode for api items without "pincodes"
+
+PRODUCT_ID_PATTERN = re.compile(r"/p/(\d+)")  # /apple-iphone-17-256gb-lavender-/p/317401 -> 317401
+
+# Reason codes that mean "cannot deliver to this pincode" rather than "no stock"
+UNSERVICEABLE_REASONS = ("SERVICEABLE", "SERVICEABILITY", "PINCODE", "ZIP", "NO_ROUTE", "NODE")
+
+API_HEADERS = {
+    "Accept": "application/json",
+    "Content-Type": "application/json",
+    "Origin": "https://www.croma.com",
+    "Referer": "https://www.croma.com/",
+}
+
+api_session = requests.Session()  # Used when the caller doesn't pass its own pooled session
+
+
+def extract_product_id_from_url(url):
+    """Extract Croma product id from URL (e.g. /apple-iphone-17-256gb-lavender-/p/317401 -> 317401)"""
+    match = PRODUCT_ID_PATTERN.search(urlparse(url).path)
+    return match.group(1) if match else None
+
+
+def build_promise_request(product_ids, pincode):
+    """Request body asking for home delivery of 1 unit of each product to pincode"""
+    lines = []
+    for number, product_id in enumerate(product_ids, start=1):
+        lines.append({
+            "fulfillmentType": "HDEL",
+            "itemID": product_id,
+            "lineId": str(number),
+            "requiredQty": "1",
+            "shipToAddress": {"zipCode": pincode},
+            "extn": {"widerStoreFlag": "N"},
+        })
+    return {
+        "promise": {
+            "allocationRuleID": "SYSTEM",
+            "checkInventory": "Y",
+            "organizationCode": "CROMA",
+            "sourcingClassification": "EC",
+            "promiseLines": {"promiseLine": lines},
+        }
+    }
+
+
+def as_list(value):
+    """The API returns a single object instead of a list when there is one line"""
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def parse_promise_response(data):
+    """Map product id -> result dict (same shape as stock_core.evaluate_item)"""
+    promise = data.get("promise") or {}
+    verdicts = {}
+
+    option = (promise.get("suggestedOption") or {}).get("option") or {}
+    for line in as_list((option.get("promiseLines") or {}).get("promiseLine")):
+        product_id = str(line.get("itemID"))
+        when = line.get("deliveryDate") or line.get("promisedDate") or ""
+        verdicts[product_id] = {
+            "delivery_unavailable": False,
+            "avail": True,
+            "matched": f"API: deliverable {when}".strip(),
+        }
+
+    unavailable = (promise.get("suggestedOption") or {}).get("unavailableLines") or promise.get("unavailableLines") or {}
+    for line in as_list(unavailable.get("unavailableLine")):
+        product_id = str(line.get("itemID"))
+        reason = (line.get("reasonCode") or line.get("reason") or "UNAVAILABLE").upper()
+        if any(word in reason for word in UNSERVICEABLE_REASONS):
+            verdicts[product_id] = {"delivery_unavailable": True, "avail": False, "matched": "Delivery Not Available"}
+        else:
+            verdicts[product_id] = {"delivery_unavailable": False, "avail": False, "matched": f"API: {reason}"}
+
+    return verdicts
+
+
+def fetch_batch(product_ids, pincode=PINCODE, session=None):
+    """One serviceability call for several product ids; returns product id -> result dict"""
+    session = session or api_session
+    response = session.post(API_BASE + SERVICEABILITY_PATH,
+                            json=build_promise_request(product_ids, pincode), headers=API_HEADERS,
+                            timeout=API_TIMEOUT)
+    response.raise_for_status()
+    return parse_promise_response(response.json())
+
+
+def batches(items):
+    """Split api items into API_BATCH_SIZE chunks"""
+    for start in range(0, len(items), API_BATCH_SIZE):
+        yield items[start:start + API_BATCH_SIZE]
+
+
+def check_batch(items, pincode=PINCODE, session=None):
+    """Check a batch of api items; returns url -> result dict (errors are reported per item)"""
+    results = {}
+    ids = {}
+    for item in items:
+        product_id = item.get("product_id") or extract_product_id_from_url(item["url"])
+        if product_id:
+            ids[item["url"]] = str(product_id)
+        else:
+            results[item["url"]] = {"error": "No product id in URL (expected /p/<id>)"}
+
+    if ids:
+        try:
+            verdicts = fetch_batch(sorted(set(ids.values())), pincode, session)
+        except Exception as e:
+            verdicts = None
+            for url in ids:
+                results[url] = {"error": f"API request failed: {e}"}
+        if verdicts is not None:
+            for url, product_id in ids.items():
+                results[url] = verdicts.get(product_id) or {
+                    "delivery_unavailable": False, "avail": None, "matched": None,
+                    "sample": f"API response had no line for product {product_id}",
+                }
+    return results
+
+
+def item_pincodes(item):
+    """The item's "pincodes" list as strings (empty = only the default pincode)"""
+    return [str(pincode) for pincode in item.get("pincodes", [])]
+
+
+def check_matrix(items, session=None):
+    """url -> {pincode: result dict} for items with "pincodes"; one batched call per distinct pincode"""
+    by_pincode = {}
+    for item in items:
+        for pincode in item_pincodes(item):
+            by_pincode.setdefault(pincode, []).append(item)
+    matrix = {item["url"]: {} for item in items}
+    for pincode, group in by_pincode.items():
+        for batch in batches(group):
+            for url, result in check_batch(batch, pincode, session).items():
+                matrix[url][pincode] = result
+    return matrix
+
+
+def with_pincodes(result, row):
+    """Attach a {pincode: result} row to a product's result
+
+    Delivery counts as unavailable only if every pincode that answered is unserviceable.
+    """
+    result = {k: v for k, v in result.items() if k != "unchanged"}
+    result["pincodes"] = row
+    answered = [r for r in row.values() if not r.get("error")]
+    result["delivery_unavailable"] = bool(answered) and all(r["delivery_unavailable"] for r in answered)
+    return result
+
+
+def matrix_result(row):
+    """Result of an api item with pincodes: in stock if deliverable with stock to any of them"""
+    answered = [r for r in row.values() if not r.get("error")]
+    if not answered:
+        return {"error": next(iter(row.values()))["error"] if row else "No pincodes"}
+    in_stock = [r for r in answered if r["avail"]]
+    if in_stock:
+        result = {"delivery_unavailable": False, "avail": True, "matched": in_stock[0]["matched"]}
+    elif all(r["avail"] is False for r in answered):
+        result = {"delivery_unavailable": False, "avail": False, "matched": answered[0]["matched"]}
+    else:
+        result = {"delivery_unavailable": False, "avail": None, "matched": None,
+                  "sample": next((r["sample"] for r in answered if r.get("sample")), "")}
+    return with_pincodes(result, row)
+
+
+def check_items(items, pincode=PINCODE, session=None):
+    """Check all api items, API_BATCH_SIZE per request; returns url -> result dict"""
+    results = {}
+    single = [item for item in items if not item.get("pincodes")]
+    for batch in batches(single):
+        started = time.perf_counter()
+        batch_results = check_batch(batch, pincode, session)
+        results.update(with_latency(batch_results, time.perf_counter() - started))
+    started = time.perf_counter()
+    matrix = check_matrix([item for item in items if item.get("pincodes")], session)
+    matrix_results = {url: matrix_result(row) for url, row in matrix.items()}
+    results.update(with_latency(matrix_results, time.perf_counter() - started))
+    return results
+
+
+def with_latency(results, seconds):
+    """Copies of a request's results carrying its duration (products sharing an id get their own dict)"""
+    return {url: dict(result, latency=seconds) for url, result in results.items()}
@@ -0,0 +1,90 @@
+# croma_api_stub.py - Local stand-in for Croma's serviceability API, answering from recorded fixtures
+#
+# Usage:
+#   python croma_api_stub.py [port]
+#   CROMA_API_BASE=http://127.0.0.1:8765 python stock_alert_simple.py
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from croma_api import SERVICEABILITY_PATH
+
+HERE = os.path.dirname(os.path.abspath(__file__))  # Fixtures are found from any working directory
+FIXTURE_FILE = os.path.join(HERE, "fixtures", "croma_api", "promise_lines.json")
+DEFAULT_PORT = 8765
+
+
+def load_fixture(path=FIXTURE_FILE):
+    """pincode (or "default") -> product id -> recorded promiseLine/unavailableLine"""
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def build_response(fixture, request_body):
+    """Assemble an API-shaped response for the requested promise lines"""
+    available = []
+    unavailable = []
+    for line in request_body.get("promise", {}).get("promiseLines", {}).get("promiseLine", []):
+        product_id = str(line.get("itemID"))
+        pincode = str(line.get("shipToAddress", {}).get("zipCode", ""))
+        recorded = fixture.get(pincode, {}).get(product_id) or fixture.get("default", {}).get(product_id)
+        if recorded is None:
+            unavailable.append({"itemID": product_id, "lineId": line.get("lineId"), "reasonCode": "INVALID_ITEM"})
+        elif "promiseLine" in recorded:
+            available.append(dict(recorded["promiseLine"], lineId=line.get("lineId")))
+        else:
+            unavailable.append(dict(recorded["unavailableLine"], lineId=line.get("lineId")))
+    return {
+        "promise": {
+            "suggestedOption": {
+                "option": {"promiseLines": {"promiseLine": available}},
+                "unavailableLines": {"unavailableLine": unavailable},
+            }
+        }
+    }
+
+
+def make_handler(fixture):
+    """Request handler class bound to a loaded fixture"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        requests_served = 0
+
+        def do_POST(self):
+            if self.path.rstrip("/") != SERVICEABILITY_PATH.rstrip("/"):
+                self.send_error(404)
+                return
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            payload = json.dumps(build_response(fixture, body)).encode("utf-8")
+            StubHandler.requests_served += 1
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            pass  # Keep the monitor's output readable
+
+    return StubHandler
+
+
+def start_stub_server(port=0, fixture_path=FIXTURE_FILE):
+    """Start the stub in a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(load_fixture(fixture_path)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_PORT
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(load_fixture()))
+    print(f"✅ Croma API stub on http://127.0.0.1:{port}{SERVICEABILITY_PATH}")
+    print(f"   Set CROMA_API_BASE=http://127.0.0.1:{port} and use check_type \"api\" in items.json")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping stub...")
@@ -0,0 +1,144 @@
+# croma_site_stub.py - Local Croma-like product pages (in stock / out of stock / delivery unavailable / slow)
+#
+# Usage:
+#   python croma_site_stub.py [port] [--latency-ms N] [--slow-ms N] [--render-ms N] [--page-kb N]
+#   Product pages are served at /<slug>/p/<id>; the id picks the variant (see variant_of)
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from string import Template
+
+HERE = os.path.dirname(os.path.abspath(__file__))  # Fixtures are found from any working directory
+TEMPLATE_FILE = os.path.join(HERE, "fixtures", "croma_pages", "product.html")
+DEFAULT_PORT = 8767
+PRODUCT_PATH = re.compile(r"^/[^/]+/p/(\d+)/?$")
+
+VARIANTS = ["in_stock", "out_of_stock", "delivery_unavailable", "slow_render"]
+
+# What each variant should be detected as: (delivery_unavailable, avail)
+EXPECTED = {
+    "in_stock": (False, True),
+    "out_of_stock": (False, False),
+    "delivery_unavailable": (True, False),
+    "slow_render": (False, True),
+}
+
+IN_STOCK_BOX = '<button class="cp-add-to-cart">Add to Cart</button> <button class="buy-now">Buy Now</button>'
+OUT_OF_STOCK_BOX = '<span class="oos-label">Out of Stock</span> <button class="notify">Notify Me</button>'
+DELIVERY_OK = '<span class="delivery-date">Delivery by Tomorrow</span> <span>Pickup from store in 2 hours</span>'
+DELIVERY_UNAVAILABLE = '<span class="delivery-not-available">Not available at 400049</span>'
+# The buy box of slow_render pages is filled in by a script after render_ms (like Croma's client-side render)
+SLOW_SCRIPT = ('<script>setTimeout(function () {{ document.getElementById("cta").innerHTML = '
+               '\'{box}\'; }}, {render_ms});</script>')
+
+NAV_LINKS = ["Televisions & Accessories", "Home Appliances", "Phones & Wearables", "Computers & Tablets",
+             "Kitchen Appliances", "Audio & Video", "Health & Fitness", "Grooming & Personal Care",
+             "Cameras & Drones", "Smart Devices", "Gaming", "Accessories", "Top Brands", "Croma Store Locator"]
+FILLER_ROW = ("<tr><td>Display Size</td><td>15.93 cm (6.3 inch)</td></tr><tr><td>Processor</td><td>A19 Bionic "
+              "chip, 6-core CPU</td></tr><tr><td>Rear Camera</td><td>48 MP + 48 MP</td></tr><tr><td>Battery</td>"
+              "<td>Up to 30 hours video playback</td></tr><tr><td>Warranty</td><td>1 Year Manufacturer</td></tr>\n")
+
+
+def variant_of(product_id):
+    """The page variant served for a product id"""
+    return VARIANTS[int(product_id) % len(VARIANTS)]
+
+
+def load_template(path=TEMPLATE_FILE):
+    with open(path, "r", encoding="utf-8") as f:
+        return Template(f.read())
+
+
+def render_page(template, product_id, page_kb=200, render_ms=1500):
+    """One product page of roughly page_kb KB for the id's variant"""
+    variant = variant_of(product_id)
+    script = ""
+    if variant == "slow_render":
+        buy_box = ""
+        script = SLOW_SCRIPT.format(box=IN_STOCK_BOX.replace("'", "\\'"), render_ms=render_ms)
+    elif variant == "out_of_stock":
+        buy_box = OUT_OF_STOCK_BOX
+    else:
+        buy_box = IN_STOCK_BOX
+    fields = {
+        "product_id": product_id,
+        "title": f"Bench Phone {product_id} (256GB, Black)",
+        "price": f"{69900 + int(product_id) % 1000 * 100:,}",
+        "nav": "".join(f'<a href="/c/{n}">{link}</a>' for n, link in enumerate(NAV_LINKS)),
+        "buy_box": buy_box,
+        "delivery": DELIVERY_UNAVAILABLE if variant == "delivery_unavailable" else DELIVERY_OK,
+        "script": script,
+        "filler": "",
+    }
+    size = len(template.substitute(fields))
+    rows = max(0, (page_kb * 1024 - size) // len(FILLER_ROW))
+    fields["filler"] = "<table class=\"specs\">\n" + FILLER_ROW * rows + "</table>"
+    return template.substitute(fields)
+
+
+def make_handler(template, latency_ms=50, slow_ms=1000, render_ms=1500, page_kb=200):
+    """Request handler class serving product pages with the given timings and size"""
+    pages = {}  # product id -> rendered bytes (pages never change during a run)
+    pages_lock = threading.Lock()
+
+    class SiteHandler(BaseHTTPRequestHandler):
+
+        def do_GET(self):
+            match = PRODUCT_PATH.match(self.path.split("?", 1)[0])
+            if not match:
+                self.send_error(404)
+                return
+            product_id = match.group(1)
+            with pages_lock:
+                body = pages.get(product_id)
+                if body is None:
+                    body = render_page(template, product_id, page_kb, render_ms).encode("utf-8")
+                    pages[product_id] = body
+            delay = slow_ms if variant_of(product_id) == "slow_render" else latency_ms
+            time.sleep(delay / 1000)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return SiteHandler
+
+
+def start_site_server(port=0, **options):
+    """Start the site in a background thread; returns (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(load_template(), **options))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def parse_options(args):
+    """Pull --latency-ms/--slow-ms/--render-ms/--page-kb out of args; returns (options, remaining args)"""
+    args = list(args)
+    options = {}
+    for flag in ("--latency-ms", "--slow-ms", "--render-ms", "--page-kb"):
+        if flag in args:
+            i = args.index(flag)
+            options[flag[2:].replace("-", "_")] = int(args[i + 1])
+            del args[i:i + 2]
+    return options, args
+
+
+if __name__ == "__main__":
+    options, args = parse_options(sys.argv[1:])
+    port = int(args[0]) if args else DEFAULT_PORT
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(load_template(), **options))
+    server.daemon_threads = True
+    # The first line is read by benchmark.py to find the port
+    print(f"✅ Croma site stub on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping stub...")
@@ -0,0 +1,117 @@
+# fake_telegram_api.py - Local stand-in for the Telegram Bot API sendMessage call
+#
+# Usage:
+#   python fake_telegram_api.py [port] [--fail-first N] [--min-interval SECONDS]
+#   TELEGRAM_API_BASE=http://127.0.0.1:8766 python stock_alert_simple.py
+import json
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_PORT = 8766
+SEND_PATH = re.compile(r"^/bot[^/]+/sendMessage$")
+
+
+class FakeTelegramServer(ThreadingHTTPServer):
+    """Records every accepted message; can fail the first N calls, answer 429 when called too fast and
+    answer 400 to messages containing the reject text (like Telegram does for broken HTML)"""
+
+    def __init__(self, port=0, fail_first=0, min_interval=0.0, reject=None, verbose=False):
+        super().__init__(("127.0.0.1", port), FakeTelegramHandler)
+        self.messages = []  # (time, chat_id, text)
+        self.calls = 0
+        self.fail_first = fail_first
+        self.min_interval = min_interval
+        self.reject = reject
+        self.verbose = verbose
+        self.last_by_chat = {}
+        self.lock = threading.Lock()
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+
+    def reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        if not SEND_PATH.match(self.path):
+            self.reply(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError:
+            self.reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: invalid JSON"})
+            return
+
+        server = self.server
+        with server.lock:
+            server.calls += 1
+            now = time.time()
+            chat_id = str(data.get("chat_id"))
+            if server.calls <= server.fail_first:
+                self.reply(502, {"ok": False, "error_code": 502, "description": "Bad Gateway"})
+                return
+            last = server.last_by_chat.get(chat_id)
+            if last is not None and now - last < server.min_interval:
+                retry_after = max(1, round(server.min_interval - (now - last)))
+                self.reply(429, {"ok": False, "error_code": 429, "description": "Too Many Requests",
+                                 "parameters": {"retry_after": retry_after}})
+                return
+            if not data.get("text"):
+                self.reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: message text is empty"})
+                return
+            if server.reject and server.reject in data["text"]:
+                self.reply(400, {"ok": False, "error_code": 400, "description": "Bad Request: can't parse entities"})
+                return
+            server.last_by_chat[chat_id] = now
+            server.messages.append((now, chat_id, data["text"]))
+            message_id = len(server.messages)
+
+        if server.verbose:
+            print(f"\n📩 [{time.strftime('%H:%M:%S')}] to {chat_id}:\n{data['text']}")
+        self.reply(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": chat_id},
+                                                "date": int(now), "text": data["text"]}})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_fake_server(port=0, **options):
+    """Start the fake API in a background thread; returns the server (see .messages, .base_url)"""
+    server = FakeTelegramServer(port, **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    options = {"verbose": True}
+    if "--fail-first" in args:
+        i = args.index("--fail-first")
+        options["fail_first"] = int(args[i + 1])
+        del args[i:i + 2]
+    if "--min-interval" in args:
+        i = args.index("--min-interval")
+        options["min_interval"] = float(args[i + 1])
+        del args[i:i + 2]
+    port = int(args[0]) if args else DEFAULT_PORT
+
+    server = FakeTelegramServer(port, **options)
+    print(f"✅ Fake Telegram Bot API on {server.base_url}")
+    print(f"   Set TELEGRAM_API_BASE={server.base_url} to send alerts here")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nReceived {len(server.messages)} message(s). Done!")
@@ -0,0 +1,348 @@
+# history.py - Every check's outcome in compact, day-partitioned files, with restock queries and export
+#
+# Usage:
+#   python history.py restocks [--url TEXT] [--since YYYY-MM-DD] [--until YYYY-MM-DD]
+#   python history.py export FILE.parquet|FILE.csv [--url TEXT] [--since ...] [--until ...]
+#   python history.py stats
+#   python history.py compact
+#
+# Storage: one 22-byte record per check in history/YYYY-MM-DD.bin (UTC days). Finished days are gzipped,
+# days older than RAW_RETENTION_DAYS are reduced to the checks where something changed, and days older
+# than HISTORY_RETENTION_DAYS are deleted - so disk use stays bounded however often products are polled.
+import csv
+import datetime
+import gzip
+import json
+import os
+import struct
+import sys
+import time
+
+# ====== CONFIG ======
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "history")
+RAW_RETENTION_DAYS = 14  # Every check is kept this long...
+HISTORY_RETENTION_DAYS = 400  # ...then only changes (stock, delivery, price), and nothing after this
+
+# time, item id, verdict, delivery, matched-indicator id, price (rupees, 0 = not found), latency (ms)
+RECORD = struct.Struct("<dIBBHIH")
+VERDICTS = ["unclear", "in_stock", "out_of_stock", "delivery_unavailable", "error"]
+DELIVERY = ["unknown", "available", "unavailable"]
+DICTIONARY_FILE = "dictionary.json"
+
+
+def verdict_code(result):
+    if result.get("error"):
+        return 4
+    if result.get("delivery_unavailable"):
+        return 3
+    return {True: 1, False: 2}.get(result.get("avail"), 0)
+
+
+def delivery_code(result):
+    if result.get("error") or result.get("delivery_unavailable") is None:
+        return 0
+    return 2 if result["delivery_unavailable"] else 1
+
+
+def day_of(ts):
+    return datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).strftime("%Y-%m-%d")
+
+
+def days_ago(days):
+    return day_of(time.time() - days * 86400)
+
+
+def read_records(path):
+    """All complete records in a partition file (a torn last record after a crash is ignored)"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rb") as f:
+        data = f.read()
+    return list(RECORD.iter_unpack(data[:len(data) - len(data) % RECORD.size]))
+
+
+def write_partition(path, records):
+    """Write records gzipped, via a temp file + rename"""
+    tmp = path + ".tmp"
+    with gzip.open(tmp, "wb") as f:
+        f.write(b"".join(RECORD.pack(*record) for record in records))
+    os.replace(tmp, path)
+
+
+def only_changes(records):
+    """Each item's first record, then only records whose verdict, delivery or price differ from its last one"""
+    last = {}
+    kept = []
+    for record in records:
+        _, item_id, verdict, delivery, _, price, _ = record
+        if verdict == 4:
+            continue  # Errors say nothing about the product
+        state = (verdict, delivery, price)
+        if last.get(item_id) != state:
+            kept.append(record)
+            last[item_id] = state
+    return kept
+
+
+class HistoryStore:
+    """Buffers check outcomes in memory and appends them to today's partition on flush()"""
+
+    def __init__(self, directory=HISTORY_DIR):
+        self.directory = directory
+        self.pending = []
+        self.day = None
+        self.dictionary = None
+        self.dictionary_dirty = False
+
+    # ---- dictionary: item URLs/names and matched indicators stored once, referenced by number ----
+
+    def load_dictionary(self):
+        try:
+            with open(os.path.join(self.directory, DICTIONARY_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            data = {}
+        self.dictionary = {
+            "items": data.get("items", []),  # [url, name]
+            "matched": data.get("matched", [""]),
+        }
+        self.item_ids = {url: number for number, (url, _) in enumerate(self.dictionary["items"])}
+        self.matched_ids = {text: number for number, text in enumerate(self.dictionary["matched"])}
+
+    def item_id(self, item):
+        url = item["url"]
+        number = self.item_ids.get(url)
+        if number is None:
+            number = self.item_ids[url] = len(self.dictionary["items"])
+            self.dictionary["items"].append([url, item.get("name")])
+            self.dictionary_dirty = True
+        elif item.get("name") and self.dictionary["items"][number][1] != item["name"]:
+            self.dictionary["items"][number][1] = item["name"]
+            self.dictionary_dirty = True
+        return number
+
+    def matched_id(self, text):
+        text = str(text or "")[:200]
+        number = self.matched_ids.get(text)
+        if number is None:
+            number = self.matched_ids[text] = len(self.dictionary["matched"])
+            self.dictionary["matched"].append(text)
+            self.dictionary_dirty = True
+        return number
+
+    def save_dictionary(self):
+        path = os.path.join(self.directory, DICTIONARY_FILE)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.dictionary, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        self.dictionary_dirty = False
+
+    # ---- writing ----
+
+    def record(self, item, result, ts=None):
+        """Queue one check outcome (written by flush())"""
+        if self.dictionary is None:
+            self.load_dictionary()
+        ts = time.time() if ts is None else ts
+        price = result.get("price") or 0
+        latency = min(65535, int((result.get("latency") or 0) * 1000))
+        self.pending.append((ts, self.item_id(item), verdict_code(result), delivery_code(result),
+                             self.matched_id(result.get("matched")), min(int(price), 0xFFFFFFFF), latency))
+
+    def flush(self):
+        """Append queued records to their day's partition; finishing a day triggers compact()"""
+        if not self.pending:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if self.dictionary_dirty:
+            self.save_dictionary()
+        by_day = {}
+        for record in self.pending:
+            by_day.setdefault(day_of(record[0]), []).append(record)
+        for day, records in by_day.items():
+            with open(os.path.join(self.directory, f"{day}.bin"), "ab") as f:
+                f.write(b"".join(RECORD.pack(*record) for record in records))
+        self.pending = []
+        today = max(by_day)
+        if today != self.day:
+            self.day = today
+            self.compact()
+
+    def compact(self):
+        """Gzip finished days, reduce old days to changes only, delete days past retention"""
+        today = day_of(time.time())
+        raw_cutoff = days_ago(RAW_RETENTION_DAYS)
+        delete_cutoff = days_ago(HISTORY_RETENTION_DAYS)
+        by_day = {}
+        for path in partitions(self.directory):
+            by_day.setdefault(os.path.basename(path)[:10], []).append(path)
+        for day, paths in by_day.items():
+            if day < delete_cutoff:
+                for path in paths:
+                    os.remove(path)
+                continue
+            if day >= today:
+                continue
+            target = os.path.join(self.directory, f"{day}.changes.gz" if day < raw_cutoff else f"{day}.bin.gz")
+            if paths == [target]:
+                continue
+            # A day's files are merged, so checks written after it was compacted are not lost
+            records = sorted((record for path in paths for record in read_records(path)), key=lambda r: r[0])
+            write_partition(target, only_changes(records) if day < raw_cutoff else records)
+            for path in paths:
+                if path != target:
+                    os.remove(path)
+
+
+# ---- reading ----
+
+def partitions(directory=HISTORY_DIR, since=None, until=None):
+    """Partition files for the days in [since, until], oldest first"""
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+    chosen = []
+    for name in names:
+        day = name[:10]
+        if not name[:4].isdigit() or name.endswith(".tmp"):
+            continue
+        if (since and day < since) or (until and day > until):
+            continue
+        chosen.append((day, name))
+    return [os.path.join(directory, name) for _, name in sorted(chosen)]
+
+
+def load_rows(directory=HISTORY_DIR, since=None, until=None, url_filter=None):
+    """Decoded rows (dicts) in time order, optionally only for URLs/names containing url_filter"""
+    store = HistoryStore(directory)
+    store.load_dictionary()
+    items = store.dictionary["items"]
+    matched = store.dictionary["matched"]
+    wanted = None
+    if url_filter:
+        needle = url_filter.lower()
+        wanted = {number for number, (url, name) in enumerate(items)
+                  if needle in url.lower() or needle in (name or "").lower()}
+    rows = []
+    for path in partitions(directory, since, until):
+        for ts, item_id, verdict, delivery, matched_id, price, latency in read_records(path):
+            if wanted is not None and item_id not in wanted:
+                continue
+            url, name = items[item_id] if item_id < len(items) else (f"#{item_id}", None)
+            rows.append({
+                "time": ts, "url": url, "name": name, "verdict": VERDICTS[verdict], "delivery": DELIVERY[delivery],
+                "matched": matched[matched_id] if matched_id < len(matched) else "",
+                "price": price or None, "latency_ms": latency,
+            })
+    rows.sort(key=lambda row: row["time"])
+    return rows
+
+
+def restock_windows(rows):
+    """url -> [(start, end or None)] periods in stock (errors and unclear checks don't end a period)"""
+    windows = {}
+    open_since = {}
+    for row in rows:
+        url = row["url"]
+        if row["verdict"] == "in_stock":
+            if url not in open_since:
+                open_since[url] = row["time"]
+        elif row["verdict"] in ("out_of_stock", "delivery_unavailable"):
+            if url in open_since:
+                windows.setdefault(url, []).append((open_since.pop(url), row["time"]))
+    for url, start in open_since.items():
+        windows.setdefault(url, []).append((start, None))
+    return windows
+
+
+def format_time(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts))
+
+
+def print_restocks(rows):
+    names = {row["url"]: row["name"] for row in rows}
+    windows = restock_windows(rows)
+    if not windows:
+        print("No restocks in the selected period.")
+        return
+    for url, periods in sorted(windows.items(), key=lambda entry: names.get(entry[0]) or entry[0]):
+        print(f"\n[{names.get(url) or url}]")
+        durations = []
+        hours = {}
+        for start, end in periods:
+            hours[time.localtime(start).tm_hour] = hours.get(time.localtime(start).tm_hour, 0) + 1
+            if end is None:
+                print(f"  🟢 {format_time(start)} → in stock now")
+            else:
+                durations.append(end - start)
+                print(f"  🟢 {format_time(start)} → {format_time(end)}  ({(end - start) / 60:.0f} min)")
+        summary = f"  📊 {len(periods)} restock(s)"
+        if durations:
+            summary += f", median {sorted(durations)[len(durations) // 2] / 60:.0f} min in stock"
+        busiest = max(hours, key=hours.get)
+        summary += f", most often starting {busiest:02d}:00-{(busiest + 1) % 24:02d}:00"
+        print(summary)
+
+
+def export_rows(rows, path):
+    """Write rows as Parquet (needs pyarrow) or CSV, chosen by the file extension"""
+    columns = {key: [row[key] for row in rows] for key in
+               ("time", "url", "name", "verdict", "delivery", "matched", "price", "latency_ms")}
+    if path.endswith(".parquet"):
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            print("❌ Parquet export needs pyarrow: pip install pyarrow (or export to a .csv file)")
+            return False
+        table = pyarrow.table(columns)
+        # Repeated strings (url, verdict, ...) stored once per column chunk
+        pyarrow.parquet.write_table(table, path, compression="zstd", use_dictionary=True)
+    else:
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            writer.writerows(zip(*columns.values()))
+    return True
+
+
+def print_stats(directory=HISTORY_DIR):
+    files = partitions(directory)
+    if not files:
+        print(f"No history in {directory}/")
+        return
+    total = sum(os.path.getsize(path) for path in files)
+    records = sum(len(read_records(path)) for path in files)
+    print(f"📁 {directory}/: {len(files)} partition(s), {records} record(s), {total / 1024 / 1024:.1f} MB")
+    print(f"   {os.path.basename(files[0])[:10]} → {os.path.basename(files[-1])[:10]}")
+
+
+def option(args, flag):
+    if flag in args:
+        return args[args.index(flag) + 1]
+    return None
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    command = args[0] if args else None
+    since = option(args, "--since")
+    until = option(args, "--until")
+    url_filter = option(args, "--url")
+
+    if command == "restocks":
+        print_restocks(load_rows(since=since, until=until, url_filter=url_filter))
+    elif command == "export" and len(args) > 1:
+        rows = load_rows(since=since, until=until, url_filter=url_filter)
+        if export_rows(rows, args[1]):
+            print(f"✅ Exported {len(rows)} check(s) to {args[1]}")
+    elif command == "stats":
+        print_stats()
+    elif command == "compact":
+        if os.path.isdir(HISTORY_DIR):
+            HistoryStore().compact()
+        print_stats()
+    else:
+        print("Usage: python history.py restocks|export FILE|stats|compact [--url TEXT] [--since DAY] [--until DAY]")
+        sys.exit(1)
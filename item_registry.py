@@ -0,0 +1,153 @@
+# item_registry.py - items.json kept in memory, reloaded only when the file changes, indexed by URL
+import ctypes
+import json
+import os
+import struct
+import sys
+
+# inotify event masks (linux/inotify.h)
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000  # Events were dropped (sent with wd -1)
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct("iIII")  # wd, mask, cookie, len
+
+
+class FileWatcher:
+    """Tells whether a file may have changed: inotify on Linux, mtime/size/inode check elsewhere"""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.name = os.path.basename(self.path).encode()
+        self.fd = None
+        self.signature = None
+        if sys.platform.startswith("linux"):
+            try:
+                self.fd = self.start_inotify()
+            except (OSError, AttributeError):
+                self.fd = None
+
+    def start_inotify(self):
+        """Watch the file's directory so atomic replaces (rename over the file) are seen too"""
+        libc = ctypes.CDLL(None, use_errno=True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(fd, os.path.dirname(self.path).encode(), WATCH_MASK)
+        if wd < 0:
+            os.close(fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+        return fd
+
+    def current_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+    def changed(self):
+        """True if the file changed since the last call (the first call always returns True)"""
+        if self.fd is not None and self.signature is not None:
+            touched = False
+            while True:
+                try:
+                    data = os.read(self.fd, 65536)
+                except BlockingIOError:
+                    break
+                offset = 0
+                while offset < len(data):
+                    wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                    name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                    # Other files in the directory (state, cache, metrics) can overflow the queue; the dropped
+                    # events may include ours, so an overflow falls back to the stat signature
+                    if name == self.name or wd == -1 or mask & IN_Q_OVERFLOW:
+                        touched = True
+                    offset += EVENT_HEADER.size + length
+            if not touched:
+                return False
+
+        signature = self.current_signature()
+        if signature == self.signature:
+            return False
+        self.signature = signature
+        return True
+
+    def mark_seen(self):
+        """Treat the file's current state as already loaded (after we wrote it ourselves)"""
+        if self.fd is not None:
+            try:
+                while os.read(self.fd, 65536):
+                    pass
+            except BlockingIOError:
+                pass
+        self.signature = self.current_signature()
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class ItemRegistry:
+    """The item list of items.json with a URL index; refresh() re-reads the file only when it changed"""
+
+    def __init__(self, path):
+        self.path = path
+        self.watcher = FileWatcher(path)
+        self.items = []
+        self.by_url = {}
+        self.listeners = []  # Called as listener(added, removed, changed) after every reload
+
+    def refresh(self):
+        """Reload if the file changed; returns (added, removed, changed) items, or None if unchanged
+
+        A missing file is an empty list. json.JSONDecodeError propagates and the old items are kept.
+        """
+        if not self.watcher.changed():
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                items = json.load(f)
+        except FileNotFoundError:
+            items = []
+        except json.JSONDecodeError:
+            self.watcher.signature = None  # Retry on the next refresh, even without a new event
+            raise
+        return self.set_items(items)
+
+    def set_items(self, items):
+        """Replace the in-memory items and return the diff against the previous list"""
+        old = self.by_url
+        new = {}
+        for item in items:
+            new.setdefault(item.get("url"), item)
+
+        added = [item for url, item in new.items() if url not in old]
+        removed = [item for url, item in old.items() if url not in new]
+        changed = [item for url, item in new.items() if url in old and old[url] != item]
+
+        self.items = items
+        self.by_url = new
+        for listener in self.listeners:
+            listener(added, removed, changed)
+        return added, removed, changed
+
+    def saved(self, items):
+        """Record items we just wrote to the file ourselves, so they aren't read back"""
+        self.watcher.mark_seen()
+        return self.set_items(items)
+
+    def get(self, url):
+        """Item with this URL, or None"""
+        return self.by_url.get(url)
+
+    def __contains__(self, url):
+        return url in self.by_url
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,312 @@
+# item_store.py - Optional SQLite backend for the product list (WAL, per-row writes, unique URL index)
+#
+# Usage:
+#   python item_store.py import [items.json]   # copy items.json into items.db
+#   python item_store.py export [items.json]   # write items.db back out as items.json
+#   ITEMS_BACKEND=sqlite python stock_alert_simple.py
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import time
+
+from item_registry import ItemRegistry
+
+# ====== CONFIG ======
+ITEMS_BACKEND = os.environ.get("ITEMS_BACKEND", "json")  # "json" (items.json) or "sqlite" (items.db)
+DB_FILE = os.environ.get("ITEMS_DB", "items.db")
+
+# Item fields stored in their own columns; anything else goes to the "extra" JSON column
+ITEM_COLUMNS = ("name", "url", "check_type", "css_selector")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS indicator_sets (
+    id INTEGER PRIMARY KEY,
+    hash TEXT NOT NULL UNIQUE,
+    available TEXT NOT NULL,
+    unavailable TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY,
+    url TEXT NOT NULL,
+    name TEXT,
+    check_type TEXT NOT NULL DEFAULT 'text',
+    css_selector TEXT,
+    indicator_set_id INTEGER NOT NULL REFERENCES indicator_sets(id),
+    extra TEXT
+);
+CREATE UNIQUE INDEX IF NOT EXISTS items_url ON items(url);
+CREATE TABLE IF NOT EXISTS item_state (
+    key TEXT PRIMARY KEY,
+    notified INTEGER,
+    delivery_status INTEGER,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+def connect(path=DB_FILE):
+    """Open the database in WAL mode (readers never block the writer) and create tables if needed"""
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA foreign_keys=ON")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def indicator_set_id(conn, item):
+    """Id of the item's indicator lists, inserting them once per distinct set"""
+    available = json.dumps(item.get("available_indicators", []), ensure_ascii=False)
+    unavailable = json.dumps(item.get("unavailable_indicators", []), ensure_ascii=False)
+    digest = hashlib.blake2b((available + "\0" + unavailable).encode("utf-8"), digest_size=16).hexdigest()
+    conn.execute("INSERT OR IGNORE INTO indicator_sets (hash, available, unavailable) VALUES (?, ?, ?)",
+                 (digest, available, unavailable))
+    return conn.execute("SELECT id FROM indicator_sets WHERE hash = ?", (digest,)).fetchone()[0]
+
+
+def item_row(conn, item):
+    """Column values for one item (indicator lists are stored by reference)"""
+    extra = {k: v for k, v in item.items()
+             if k not in ITEM_COLUMNS and k not in ("available_indicators", "unavailable_indicators")}
+    return (
+        item["url"],
+        item.get("name"),
+        item.get("check_type", "text"),
+        item.get("css_selector"),
+        indicator_set_id(conn, item),
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+
+def row_to_item(row):
+    """Rebuild an items.json-style dict from a joined row"""
+    url, name, check_type, css_selector, available, unavailable, extra = row
+    item = {"name": name, "url": url, "check_type": check_type}
+    if css_selector is not None:
+        item["css_selector"] = css_selector
+    item["available_indicators"] = json.loads(available)
+    item["unavailable_indicators"] = json.loads(unavailable)
+    if extra:
+        item.update(json.loads(extra))
+    return item
+
+
+ITEM_SELECT = """
+SELECT i.url, i.name, i.check_type, i.css_selector, s.available, s.unavailable, i.extra
+FROM items i JOIN indicator_sets s ON s.id = i.indicator_set_id
+"""
+
+
+def load_items(conn):
+    """All items in the order they were added"""
+    return [row_to_item(row) for row in conn.execute(ITEM_SELECT + " ORDER BY i.id")]
+
+
+def get_item(conn, url):
+    """One item by URL via the unique index, or None"""
+    row = conn.execute(ITEM_SELECT + " WHERE i.url = ?", (url,)).fetchone()
+    return row_to_item(row) if row else None
+
+
+def add_item(conn, item):
+    """Insert one item; raises sqlite3.IntegrityError if the URL is already stored"""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("INSERT INTO items (url, name, check_type, css_selector, indicator_set_id, extra) "
+                     "VALUES (?, ?, ?, ?, ?, ?)", item_row(conn, item))
+
+
+def add_items(conn, items):
+    """Insert many items in one transaction; returns the number added (existing URLs are skipped)"""
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        added = 0
+        for item in items:
+            added += conn.execute("INSERT OR IGNORE INTO items (url, name, check_type, css_selector, indicator_set_id, "
+                                  "extra) VALUES (?, ?, ?, ?, ?, ?)", item_row(conn, item)).rowcount
+        return added
+
+
+def remove_item(conn, url):
+    """Delete one item; returns True if it existed"""
+    with conn:
+        return conn.execute("DELETE FROM items WHERE url = ?", (url,)).rowcount > 0
+
+
+def count_items(conn):
+    return conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+
+def save_state(conn, changes):
+    """Upsert last-known alert state: changes is {key: (notified, delivery_status)}"""
+    now = time.time()
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO item_state (key, notified, delivery_status, updated_at) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET notified = excluded.notified, "
+            "delivery_status = excluded.delivery_status, updated_at = excluded.updated_at",
+            [(key, notified, delivery, now) for key, (notified, delivery) in changes.items()],
+        )
+
+
+def load_state(conn):
+    """Last-known alert state: {key: (notified, delivery_status)} (None = unknown)"""
+    state = {}
+    for key, notified, delivery, _ in conn.execute("SELECT key, notified, delivery_status, updated_at FROM item_state"):
+        state[key] = (None if notified is None else bool(notified), None if delivery is None else bool(delivery))
+    return state
+
+
+def delete_state(conn, keys):
+    with conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany("DELETE FROM item_state WHERE key = ?", [(key,) for key in keys])
+
+
+class SqliteStateStore:
+    """Same interface as state_journal.StateJournal, keeping alert state in the item_state table"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.state = {}
+        self.pending = {}
+        self.removed = set()
+
+    def load(self):
+        self.state = load_state(self.conn)
+        return dict(self.state)
+
+    def record(self, key, notified, delivery):
+        value = (notified, delivery)
+        if self.state.get(key) == value:
+            return
+        self.state[key] = value
+        self.pending[key] = value
+        self.removed.discard(key)
+
+    def forget(self, keys):
+        for key in keys:
+            if key in self.state:
+                del self.state[key]
+                self.pending.pop(key, None)
+                self.removed.add(key)
+
+    def flush(self):
+        """One transaction for all rows changed since the last flush"""
+        if self.pending:
+            save_state(self.conn, self.pending)
+            self.pending = {}
+        if self.removed:
+            delete_state(self.conn, self.removed)
+            self.removed = set()
+
+
+class SqliteRegistry(ItemRegistry):
+    """ItemRegistry backed by items.db; reloads when another connection has committed a change"""
+
+    def __init__(self, path=DB_FILE):
+        self.path = path
+        self.conn = connect(path)
+        self.version = None
+        self.items = []
+        self.by_url = {}
+        self.loaded = False
+        self.listeners = []
+
+    def refresh(self):
+        """Reload if the database changed; returns (added, removed, changed) or None"""
+        # data_version changes whenever another connection commits
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if self.loaded and version == self.version:
+            return None
+        self.version = version
+        self.loaded = True
+        return self.set_items(load_items(self.conn))
+
+    def get(self, url):
+        if self.loaded:
+            return self.by_url.get(url)
+        return get_item(self.conn, url)
+
+    def __contains__(self, url):
+        return self.get(url) is not None
+
+    def __len__(self):
+        return len(self.items) if self.loaded else count_items(self.conn)
+
+    def insert(self, item):
+        """Add one product as a single row (no rewrite of the rest of the list)"""
+        add_item(self.conn, item)
+        if self.loaded:
+            self.items = self.items + [item]
+            self.by_url[item["url"]] = item
+
+    def insert_many(self, items):
+        """Add many products in one transaction (URLs already stored are skipped); returns the number added"""
+        added = add_items(self.conn, items)
+        if self.loaded:
+            new = [item for item in items if item["url"] not in self.by_url]
+            self.items = self.items + new
+            for item in new:
+                self.by_url.setdefault(item["url"], item)
+        return added
+
+    def saved(self, items):
+        """Store a whole item list (used by callers written for items.json)"""
+        with self.conn:
+            self.conn.execute("BEGIN IMMEDIATE")
+            self.conn.execute("DELETE FROM items")
+            for item in items:
+                self.conn.execute("INSERT OR IGNORE INTO items (url, name, check_type, css_selector, "
+                                  "indicator_set_id, extra) VALUES (?, ?, ?, ?, ?, ?)", item_row(self.conn, item))
+        return self.set_items(items)
+
+
+def write_json_atomic(path, items):
+    """Write items.json via a temp file + rename so readers never see a half-written file"""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(items, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def import_json(json_path, db_path=DB_FILE):
+    """Copy items from an items.json file into the database; returns (added, total)"""
+    with open(json_path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+    conn = connect(db_path)
+    try:
+        added = add_items(conn, items)
+        return added, count_items(conn)
+    finally:
+        conn.close()
+
+
+def export_json(json_path, db_path=DB_FILE):
+    """Write the database's items out in items.json format; returns the number written"""
+    conn = connect(db_path)
+    try:
+        items = load_items(conn)
+    finally:
+        conn.close()
+    write_json_atomic(json_path, items)
+    return len(items)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python item_store.py import|export [items.json]")
+        sys.exit(1)
+
+    json_path = sys.argv[2] if len(sys.argv) > 2 else "items.json"
+    if sys.argv[1] == "import":
+        added, total = import_json(json_path)
+        print(f"✅ Imported {added} new product(s) from {json_path} - {total} in {DB_FILE}")
+    else:
+        written = export_json(json_path)
+        print(f"✅ Exported {written} product(s) from {DB_FILE} to {json_path}")
@@ -0,0 +1,213 @@
+# metrics.py - Per-stage timings and counters, served on /metrics (Prometheus) and/or written as JSON lines
+#
+# Usage:
+#   METRICS_PORT=9108 python stock_alert_selenium.py      # then: curl http://127.0.0.1:9108/metrics
+#   METRICS_LOG=metrics.jsonl python stock_alert_simple.py
+# With neither set everything here is a no-op (one flag check per call).
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# ====== CONFIG ======
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))  # 0 = no /metrics endpoint
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_LOG = os.environ.get("METRICS_LOG", "")  # JSON-lines file; empty = no log
+BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)  # Stage duration histogram, seconds
+PREFIX = "stock_"
+
+HELP = {
+    "stage_seconds": ("histogram", "Time spent per check stage"),
+    "checks_total": ("counter", "Products checked"),
+    "check_errors_total": ("counter", "Checks that failed with an error"),
+    "verdicts_total": ("counter", "Check results by verdict"),
+    "telegram_sent_total": ("counter", "Alerts delivered to Telegram"),
+    "telegram_failed_total": ("counter", "Alerts dropped after being rejected or failing too often"),
+    "telegram_retries_total": ("counter", "Telegram sends that failed and will be retried"),
+    "telegram_throttled_total": ("counter", "Telegram sends answered with 429 Too Many Requests"),
+    "sweeps_total": ("counter", "Full sweeps over all products"),
+    "sweep_overruns_total": ("counter", "Sweeps that took longer than the check interval"),
+    "last_sweep_seconds": ("gauge", "Duration of the most recent sweep"),
+    "last_sweep_items": ("gauge", "Products in the most recent sweep"),
+    "schedule_lag_seconds": ("gauge", "How late the most overdue product was when last picked up (adaptive mode)"),
+}
+
+enabled = False
+lock = threading.Lock()
+counters = {}  # (name, labels) -> value; labels is a sorted tuple of (key, value)
+gauges = {}  # name -> value
+stages = {}  # stage -> [count per bucket..., +Inf count, sum]
+log_file = None
+server = None
+
+
+class StageTimer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+def stage(name):
+    """with metrics.stage("navigate"): ... - times the block (a shared no-op when metrics are off)"""
+    if not enabled:
+        return NULL_TIMER
+    return StageTimer(name)
+
+
+def observe(name, seconds):
+    """Add one duration to a stage's histogram"""
+    if not enabled:
+        return
+    with lock:
+        histogram = stages.get(name)
+        if histogram is None:
+            histogram = stages[name] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                histogram[i] += 1
+        histogram[-2] += 1
+        histogram[-1] += seconds
+
+
+def inc(name, amount=1, **labels):
+    """Increase a counter, e.g. inc("verdicts_total", verdict="in_stock")"""
+    if not enabled:
+        return
+    key = (name, tuple(sorted(labels.items())))
+    with lock:
+        counters[key] = counters.get(key, 0) + amount
+
+
+def set_gauge(name, value):
+    if not enabled:
+        return
+    with lock:
+        gauges[name] = value
+
+
+def log_event(event, **fields):
+    """Append one JSON line to METRICS_LOG (nothing is serialized when the log is off)"""
+    if log_file is None:
+        return
+    fields["ts"] = round(time.time(), 3)
+    fields["event"] = event
+    line = json.dumps(fields, ensure_ascii=False, default=str) + "\n"
+    with lock:
+        log_file.write(line)
+        log_file.flush()
+
+
+def stage_totals():
+    """stage -> (count, seconds) so far"""
+    with lock:
+        return {name: (histogram[-2], histogram[-1]) for name, histogram in stages.items()}
+
+
+def label_text(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    with lock:
+        counter_items = sorted(counters.items())
+        gauge_items = sorted(gauges.items())
+        stage_items = sorted((name, list(histogram)) for name, histogram in stages.items())
+
+    lines = []
+    described = set()
+
+    def describe(name):
+        if name in described or name not in HELP:
+            return
+        described.add(name)
+        kind, text = HELP[name]
+        lines.append(f"# HELP {PREFIX}{name} {text}")
+        lines.append(f"# TYPE {PREFIX}{name} {kind}")
+
+    if stage_items:
+        describe("stage_seconds")
+    for name, histogram in stage_items:
+        for bound, count in zip(BUCKETS, histogram):
+            lines.append(f'{PREFIX}stage_seconds_bucket{{stage="{name}",le="{bound}"}} {count}')
+        lines.append(f'{PREFIX}stage_seconds_bucket{{stage="{name}",le="+Inf"}} {histogram[-2]}')
+        lines.append(f'{PREFIX}stage_seconds_count{{stage="{name}"}} {histogram[-2]}')
+        lines.append(f'{PREFIX}stage_seconds_sum{{stage="{name}"}} {histogram[-1]:.6f}')
+    for (name, labels), value in counter_items:
+        describe(name)
+        lines.append(f"{PREFIX}{name}{label_text(labels)} {value}")
+    for name, value in gauge_items:
+        describe(name)
+        lines.append(f"{PREFIX}{name} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=METRICS_PORT, log_path=METRICS_LOG, host=METRICS_HOST):
+    """Turn metrics on if a port or log file is configured; returns True if they are on"""
+    global enabled, log_file, server
+    if port:
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        print(f"📈 Metrics on http://{host}:{server.server_address[1]}/metrics")
+    if log_path:
+        log_file = open(log_path, "a", encoding="utf-8")
+        print(f"📈 Metrics log: {log_path}")
+    enabled = bool(port or log_path)
+    return enabled
+
+
+def stop():
+    """Close the endpoint and the log file"""
+    global enabled, log_file, server
+    enabled = False
+    if server is not None:
+        server.shutdown()
+        server.server_close()
+        server = None
+    if log_file is not None:
+        with lock:
+            log_file.close()
+            log_file = None
@@ -0,0 +1,241 @@
+# notifier.py - Background Telegram dispatcher: persistent session, per-chat rate limit,
+# burst coalescing and a durable retry queue, so a slow or failing Bot API never stalls a sweep
+import json
+import os
+import threading
+import time
+import uuid
+import requests
+
+import metrics
+
+# ====== CONFIG ======
+# Override with TELEGRAM_API_BASE=http://127.0.0.1:8766 to use fake_telegram_api.py
+API_BASE = os.environ.get("TELEGRAM_API_BASE", "https://api.telegram.org")
+QUEUE_FILE = "telegram_queue.jsonl"  # Unsent messages survive restarts here
+SEND_TIMEOUT = 10
+CHAT_MIN_INTERVAL = 1.1  # Seconds between messages to one chat (Telegram allows ~1/s per chat)
+COALESCE_SECONDS = 2.0  # Wait this long after the first alert of a burst so others can join it
+MAX_MESSAGE_CHARS = 4096  # Telegram's limit for one message
+MESSAGE_SEPARATOR = "\n\n━━━━━━━━━━\n\n"
+BACKOFF_BASE = 2.0
+BACKOFF_MAX = 300.0
+MAX_ATTEMPTS = 20  # Give up on a message after this many failed sends
+
+
+class TelegramDispatcher:
+    """Queues messages and sends them from a background thread"""
+
+    def __init__(self, token, chat_id, queue_file=QUEUE_FILE, api_base=None):
+        self.token = token
+        self.chat_id = chat_id
+        self.queue_file = queue_file
+        self.api_base = api_base or API_BASE
+        self.session = requests.Session()
+        self.cond = threading.Condition()
+        self.pending = []  # {"id", "chat_id", "text", "created", "attempts", "next_try", "solo"}
+        self.chat_ready_at = {}  # chat_id -> earliest time the next message may go out
+        self.thread = None
+        self.stopping = False
+        self.stop_deadline = None
+        self.sent = 0
+        self.failed = 0
+        self.loaded = False  # The queue file is read on start(), so processes that never send don't touch it
+
+    # ---- durable queue ----
+
+    def load_queue(self):
+        """Pick up messages a previous run could not deliver"""
+        try:
+            with open(self.queue_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        msg = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line after a crash
+                    msg.setdefault("attempts", 0)
+                    msg["next_try"] = 0
+                    self.pending.append(msg)
+        except FileNotFoundError:
+            pass
+        if self.pending:
+            print(f"📨 {len(self.pending)} unsent Telegram message(s) from the last run queued for retry")
+
+    def persistent_fields(self, msg):
+        return {k: msg[k] for k in ("id", "chat_id", "text", "created")}
+
+    def append_to_file(self, msg):
+        with open(self.queue_file, "a", encoding="utf-8") as f:
+            f.write(json.dumps(self.persistent_fields(msg), ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def rewrite_file(self):
+        """Keep only undelivered messages in the queue file (called with self.cond held)"""
+        tmp = self.queue_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for msg in self.pending:
+                f.write(json.dumps(self.persistent_fields(msg), ensure_ascii=False) + "\n")
+        os.replace(tmp, self.queue_file)
+
+    # ---- public API ----
+
+    def enqueue(self, text, chat_id=None):
+        """Queue a message; returns immediately"""
+        msg = {
+            "id": uuid.uuid4().hex,
+            "chat_id": chat_id or self.chat_id,
+            "text": text,
+            "created": time.time(),
+            "attempts": 0,
+            "next_try": 0,
+        }
+        self.start()
+        with self.cond:
+            try:
+                self.append_to_file(msg)
+            except OSError as e:
+                print(f"⚠️  Could not persist Telegram message: {e}")
+            self.pending.append(msg)
+            self.cond.notify()
+        return True
+
+    def start(self):
+        """Start the sender thread (once)"""
+        with self.cond:
+            if not self.loaded:
+                self.load_queue()
+                self.loaded = True
+            if self.thread is None or not self.thread.is_alive():
+                self.stopping = False
+                self.thread = threading.Thread(target=self.run, name="telegram-sender", daemon=True)
+                self.thread.start()
+
+    def stop(self, timeout=10):
+        """Try to deliver what's queued within timeout, then stop (the rest stays in the queue file)"""
+        with self.cond:
+            self.stopping = True
+            self.stop_deadline = time.time() + timeout
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        self.session.close()
+
+    # ---- sender thread ----
+
+    def next_batch(self, now):
+        """Messages to send now as one coalesced message, or (None, seconds to wait)
+
+        Each chat gets its messages in the order they were queued: a message that is backing off holds
+        back the ones queued after it, and they are joined behind it when it is retried.
+        """
+        if not self.pending:
+            return None, None
+        queues = {}  # chat_id -> its messages, oldest first
+        for msg in sorted(self.pending, key=lambda m: m["created"]):
+            queues.setdefault(msg["chat_id"], []).append(msg)
+
+        shortest_wait = None
+        for chat_id, queue in sorted(queues.items(), key=lambda entry: entry[1][0]["created"]):
+            first = queue[0]
+            wait = max(first["next_try"], self.chat_ready_at.get(chat_id, 0)) - now
+            if not self.stopping:
+                wait = max(wait, first["created"] + COALESCE_SECONDS - now)
+            if wait > 0:
+                shortest_wait = wait if shortest_wait is None else min(shortest_wait, wait)
+                continue
+
+            if first.get("solo"):
+                return [first], 0
+            batch = []
+            length = 0
+            for msg in queue:
+                extra = len(msg["text"]) + (len(MESSAGE_SEPARATOR) if batch else 0)
+                if msg.get("solo") or (batch and length + extra > MAX_MESSAGE_CHARS):
+                    break  # Later messages wait their turn rather than overtake this one
+                batch.append(msg)
+                length += extra
+            return batch, 0
+        return None, shortest_wait
+
+    def run(self):
+        while True:
+            with self.cond:
+                while True:
+                    now = time.time()
+                    if self.stopping and (not self.pending or now >= self.stop_deadline):
+                        return
+                    batch, wait = self.next_batch(now)
+                    if batch:
+                        break
+                    if self.stopping and wait is not None:
+                        wait = min(wait, self.stop_deadline - now)
+                    self.cond.wait(timeout=wait)
+
+            with metrics.stage("notify"):
+                status, retry_after = self.post(batch[0]["chat_id"], MESSAGE_SEPARATOR.join(m["text"] for m in batch))
+
+            with self.cond:
+                now = time.time()
+                self.chat_ready_at[batch[0]["chat_id"]] = now + max(CHAT_MIN_INTERVAL, retry_after or 0)
+                if status == "ok":
+                    self.sent += len(batch)
+                    metrics.inc("telegram_sent_total", len(batch))
+                    self.remove(batch)
+                elif status == "rejected" and len(batch) > 1:
+                    # One of the joined messages upset the API - send them one by one instead
+                    for msg in batch:
+                        msg["solo"] = True
+                elif status == "rejected":
+                    print(f"Telegram rejected a message, dropping it: {batch[0]['text'][:80]!r}")
+                    self.failed += 1
+                    metrics.inc("telegram_failed_total")
+                    self.remove(batch)
+                elif status == "retry":
+                    metrics.inc("telegram_retries_total")
+                    for msg in batch:
+                        msg["attempts"] += 1
+                        msg["next_try"] = now + min(BACKOFF_MAX, BACKOFF_BASE ** msg["attempts"])
+                    dropped = [m for m in batch if m["attempts"] >= MAX_ATTEMPTS]
+                    if dropped:
+                        print(f"Telegram send failed {MAX_ATTEMPTS} times, dropping {len(dropped)} message(s)")
+                        self.failed += len(dropped)
+                        metrics.inc("telegram_failed_total", len(dropped))
+                        self.remove(dropped)
+                else:  # "throttled": only chat_ready_at moves, attempts are not counted
+                    metrics.inc("telegram_throttled_total")
+
+    def remove(self, done):
+        """Forget delivered/dropped messages (called with self.cond held)"""
+        ids = {m["id"] for m in done}
+        self.pending = [m for m in self.pending if m["id"] not in ids]
+        try:
+            self.rewrite_file()
+        except OSError as e:
+            print(f"⚠️  Could not update Telegram queue file: {e}")
+
+    def post(self, chat_id, text):
+        """One sendMessage call: returns (status, retry_after) with status ok/retry/throttled/rejected"""
+        try:
+            response = self.session.post(
+                f"{self.api_base}/bot{self.token}/sendMessage",
+                json={"chat_id": chat_id, "text": text, "parse_mode": "HTML"},
+                timeout=SEND_TIMEOUT,
+            )
+        except Exception as e:
+            print(f"Telegram send failed: {e}")
+            return "retry", None
+
+        if response.status_code == 429:
+            try:
+                retry_after = response.json().get("parameters", {}).get("retry_after", 5)
+            except ValueError:
+                retry_after = 5
+            return "throttled", retry_after
+        if response.status_code == 400:  # Bad request (e.g. broken HTML) - retrying won't help
+            print(f"Telegram send failed: HTTP 400 {response.text[:200]}")
+            return "rejected", None
+        if response.status_code >= 300:  # Server errors, bad token/chat: keep the message and retry later
+            print(f"Telegram send failed: HTTP {response.status_code}")
+            return "retry", None
+        return "ok", None
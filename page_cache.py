@@ -0,0 +1,118 @@
+# page_cache.py - Per-URL HTTP validators + content hashes so unchanged pages are not re-parsed
+import hashlib
+import json
+import os
+import threading
+
+# ====== CONFIG ======
+CACHE_FILE = "page_cache.json"
+
+cache = {}  # url -> {"etag", "last_modified", "body_hash", "region_hash", "region_fingerprint", "result"}
+lock = threading.Lock()
+dirty = False
+
+
+def load_cache():
+    """Load the cache written by a previous run (missing or broken file = empty cache)"""
+    global dirty
+    try:
+        with open(CACHE_FILE, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        data = {}
+    with lock:
+        cache.clear()
+        cache.update(data)
+        dirty = False
+
+
+def save_cache(keep_urls=None):
+    """Write the cache atomically if it changed; entries for URLs not in keep_urls are dropped"""
+    global dirty
+    with lock:
+        if keep_urls is not None:
+            for url in [u for u in cache if u not in keep_urls]:
+                del cache[url]
+                dirty = True
+        if not dirty:
+            return
+        snapshot = json.dumps(cache, ensure_ascii=False)
+        dirty = False
+    tmp = CACHE_FILE + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(snapshot)
+    os.replace(tmp, CACHE_FILE)
+
+
+def content_hash(*parts):
+    """Stable short hash of one or more strings"""
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def item_key(item):
+    """Item config as a string, hashed together with page content so editing indicators invalidates the cache"""
+    return json.dumps(item, sort_keys=True, ensure_ascii=False)
+
+
+def conditional_headers(url):
+    """If-None-Match / If-Modified-Since headers for a URL we've fetched before"""
+    with lock:
+        entry = cache.get(url)
+    if not entry or not entry.get("result"):
+        return {}
+    headers = {}
+    if entry.get("etag"):
+        headers["If-None-Match"] = entry["etag"]
+    if entry.get("last_modified"):
+        headers["If-Modified-Since"] = entry["last_modified"]
+    return headers
+
+
+def remember_validators(url, response_headers):
+    """Store ETag / Last-Modified from a 200 response"""
+    global dirty
+    etag = response_headers.get("ETag")
+    last_modified = response_headers.get("Last-Modified")
+    with lock:
+        entry = cache.setdefault(url, {})
+        if entry.get("etag") != etag or entry.get("last_modified") != last_modified:
+            entry["etag"] = etag
+            entry["last_modified"] = last_modified
+            dirty = True
+
+
+def cached_value(url, key):
+    """One stored field of a URL's entry (e.g. a hash), or None"""
+    with lock:
+        return cache.get(url, {}).get(key)
+
+
+def cached_result(url, key="region_hash", digest=None):
+    """Previous verdict for url if its stored hash under key equals digest (digest=None: any hash)"""
+    with lock:
+        entry = cache.get(url)
+        if not entry or not entry.get("result"):
+            return None
+        if digest is not None and entry.get(key) != digest:
+            return None
+        return dict(entry["result"], unchanged=True)
+
+
+def store_result(url, result, **hashes):
+    """Remember the verdict and the hashes it was computed from"""
+    global dirty
+    if result.get("error"):
+        return
+    stored = {k: v for k, v in result.items() if k not in ("unchanged", "load_stats")}
+    with lock:
+        entry = cache.setdefault(url, {})
+        # Re-storing the same verdict and hashes (a cache hit) must not make save_cache() rewrite the file
+        if entry.get("result") == stored and all(entry.get(key) == value for key, value in hashes.items()):
+            return
+        entry.update(hashes)
+        entry["result"] = stored
+        dirty = True
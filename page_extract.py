@@ -0,0 +1,117 @@
+# page_extract.py - Delivery / price / stock text of a product page with lxml (runs in the parse processes)
+#
+# Only lxml is imported here: the simple checker forks processes that run extract_page(), and they must
+# not open item stores, sessions or other files of their own.
+import signal
+
+import cssselect
+import lxml.html
+from lxml import etree
+
+# ====== CONFIG ======
+SAMPLE_CHARS = 500  # Text kept for "status unclear" output
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}  # Their text is not shown on the page
+
+translator = cssselect.HTMLTranslator()
+compiled = {}  # CSS selector -> etree.XPath (compiled once per process)
+
+
+def selector(css):
+    """A CSS selector list compiled to one XPath expression (cached)
+
+    cssselect turns "a, b, c" into a union that tests every element once per selector. Plain .class / #id
+    selectors are merged behind one [@class or @id] test here, so most elements are tested only once.
+    """
+    sel = compiled.get(css)
+    if sel is None:
+        conditions = []
+        paths = []
+        for parsed in cssselect.parse(css):
+            expr = translator.xpath(parsed.parsed_tree)
+            keyed = isinstance(parsed.parsed_tree, (cssselect.parser.Class, cssselect.parser.Hash))
+            if keyed and not expr.path and expr.element == "*" and not parsed.pseudo_element:
+                conditions.append(f"({expr.condition})")
+            else:
+                paths.append(translator.selector_to_xpath(parsed))
+        if conditions:
+            paths.insert(0, f"descendant-or-self::*[@class or @id][{' or '.join(conditions)}]")
+        sel = compiled[css] = etree.XPath(" | ".join(paths))
+    return sel
+
+
+def visible_texts(el):
+    """Text pieces of an element in document order, without script/style content and comments"""
+    for event, node in etree.iterwalk(el, events=("start", "end")):
+        if event == "start":
+            if node.text and isinstance(node.tag, str) and node.tag not in SKIPPED_TAGS:
+                yield node.text
+        elif node is not el and node.tail:
+            yield node.tail
+
+
+def element_text(el):
+    """Visible text of an element with whitespace collapsed (like BeautifulSoup's get_text(" ", strip=True))"""
+    return " ".join(" ".join(visible_texts(el)).split())
+
+
+def leading_text(el, limit=SAMPLE_CHARS):
+    """The first limit characters of an element's visible text (stops reading there)"""
+    words = []
+    size = 0
+    for piece in visible_texts(el):
+        words.extend(piece.split())
+        size += len(piece)
+        if size >= limit:
+            break
+    return " ".join(words)[:limit]
+
+
+def region_text(elements):
+    """Lowercased text of the elements, skipping any inside an element already taken (like REGION_SCRIPT)"""
+    kept = set()
+    texts = []
+    for el in elements:
+        if any(parent in kept for parent in el.iterancestors()):
+            continue
+        kept.add(el)
+        text = element_text(el).lower()
+        if text:
+            texts.append(text)
+    return "\n".join(texts)
+
+
+def extract_page(html, region_selector, delivery_selector, price_selectors, css_selector=None):
+    """Parse a page once and return the parts the verdict is made from
+
+    {"text": lowercased text of the stock region - css_selector's element if given, else the elements matching
+     region_selector (None if there are none), "delivery": [lowercased text of each delivery element],
+     "price": text of the first price_selectors entry found, "sample": start of the body}
+    """
+    doc = lxml.html.document_fromstring(html if html.strip() else "<html></html>")
+    if css_selector:
+        found = selector(css_selector)(doc)[:1]
+    else:
+        found = selector(region_selector)(doc)
+    text = region_text(found) if found else None
+    delivery = []
+    if delivery_selector:
+        delivery = [element_text(el).lower() for el in selector(delivery_selector)(doc)]
+    price = ""
+    for css in price_selectors:
+        prices = selector(css)(doc)
+        if prices:
+            price = element_text(prices[0])
+            break
+    body = doc.find("body")
+    return {
+        "text": text,
+        "delivery": delivery,
+        "price": price,
+        "sample": leading_text(doc if body is None else body),
+    }
+
+
+def ignore_interrupts():
+    """Parse processes leave Ctrl+C to the main process (which shuts them down)"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
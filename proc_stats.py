@@ -0,0 +1,72 @@
+# proc_stats.py - Memory and CPU of a process and its descendants, read from /proc (Linux only)
+import os
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+
+def read_stat(pid):
+    """Fields of /proc/<pid>/stat after the command name (field 3 onwards)"""
+    with open(f"/proc/{pid}/stat", "r") as f:
+        stat = f.read()
+    # The command name is in parentheses and may contain spaces
+    return stat[stat.rindex(")") + 2:].split()
+
+
+def process_tree(pid, skip=()):
+    """pid and all its descendants, leaving out the subtrees of pids in skip"""
+    children = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            ppid = int(read_stat(entry)[1])  # Field 4
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(ppid, []).append(int(entry))
+
+    tree = []
+    todo = [pid]
+    while todo:
+        current = todo.pop()
+        if current in skip:
+            continue
+        tree.append(current)
+        todo.extend(children.get(current, []))
+    return tree
+
+
+def process_tree_rss_mb(pid, skip=()):
+    """Resident memory (MB) of a process and all its descendants (None if /proc can't be read)"""
+    try:
+        tree = process_tree(pid, skip)
+    except OSError:
+        return None
+
+    total_kb = 0
+    for current in tree:
+        try:
+            with open(f"/proc/{current}/status", "r") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        total_kb += int(line.split()[1])
+                        break
+        except OSError:
+            pass
+    return total_kb / 1024
+
+
+def process_tree_cpu_seconds(pid, skip=()):
+    """User + system CPU seconds used so far by a process and its living descendants"""
+    try:
+        tree = process_tree(pid, skip)
+    except OSError:
+        return None
+
+    ticks = 0
+    for current in tree:
+        try:
+            fields = read_stat(current)
+            ticks += int(fields[11]) + int(fields[12])  # utime, stime (fields 14 and 15)
+        except (OSError, IndexError, ValueError):
+            pass
+    return ticks / CLOCK_TICKS
@@ -0,0 +1,130 @@
+# scheduler.py - Per-product polling: hot/recently-changed items more often, long-stable items less
+import heapq
+import random
+import time
+
+import metrics
+
+# ====== CONFIG ======
+HOT_INTERVAL_SECONDS = 20  # Items with "hot": true, and items whose status changed recently
+MIN_INTERVAL_SECONDS = 15  # Never poll one product more often than this
+MAX_INTERVAL_SECONDS = 30 * 60  # Never leave a product unchecked longer than this
+RECENT_CHANGE_SECONDS = 60 * 60  # "Changed recently" = within the last hour
+STABLE_CHECKS_BEFORE_BACKOFF = 5  # Unchanged checks before the interval starts growing
+BACKOFF_FACTOR = 1.5  # Interval multiplier for each further unchanged check
+JITTER = 0.15  # +/- 15% random spread so checks don't line up into bursts
+STARTUP_SPREAD_SECONDS = 10  # First checks are spread over this window instead of all at once
+
+
+def verdict_of(result):
+    """The part of a check result that counts as the product's status"""
+    if result.get("error"):
+        return None
+    pincodes = tuple(sorted((pincode, r.get("delivery_unavailable")) for pincode, r in result.get("pincodes", {}).items()))
+    return (result["delivery_unavailable"], result["avail"], pincodes)
+
+
+class AdaptiveScheduler:
+    """Priority queue of products keyed by next due time
+
+    Each product's next check is scheduled from the moment its previous check finished, so a
+    slow check pushes back only that product and a product is never queued twice.
+    """
+
+    def __init__(self, base_interval_seconds):
+        self.base_interval = base_interval_seconds
+        self.heap = []  # (due, sequence, url); stale entries are skipped when popped
+        self.entries = {}  # url -> {"item", "due", "interval", "stable", "last_change", "verdict", "running"}
+        self.sequence = 0
+
+    def push(self, url, due):
+        entry = self.entries[url]
+        entry["due"] = due
+        self.sequence += 1
+        heapq.heappush(self.heap, (due, self.sequence, url))
+
+    def sync(self, items, now=None):
+        """Follow the current item list: new products are scheduled, removed ones dropped"""
+        now = time.time() if now is None else now
+        current = set()
+        for item in items:
+            url = item["url"]
+            current.add(url)
+            entry = self.entries.get(url)
+            if entry is not None:
+                entry["item"] = item  # Picks up edited "hot" / "poll_interval_min"
+                continue
+            self.entries[url] = {"item": item, "due": None, "interval": self.base_for(item),
+                                 "stable": 0, "last_change": None, "verdict": None, "running": False}
+            self.push(url, now + random.uniform(0, min(STARTUP_SPREAD_SECONDS, self.base_for(item))))
+        for url in [u for u in self.entries if u not in current]:
+            del self.entries[url]  # Its heap entries are ignored from now on
+
+    def base_for(self, item):
+        """The item's own polling interval, or the global one"""
+        if item.get("poll_interval_min"):
+            return max(MIN_INTERVAL_SECONDS, float(item["poll_interval_min"]) * 60)
+        return self.base_interval
+
+    def pop_due(self, now=None, limit=None):
+        """Items whose time has come, most overdue first; they stay 'running' until complete()"""
+        now = time.time() if now is None else now
+        due = []
+        while self.heap and self.heap[0][0] <= now and (limit is None or len(due) < limit):
+            when, _, url = heapq.heappop(self.heap)
+            entry = self.entries.get(url)
+            if entry is None or entry["running"] or entry["due"] != when:
+                continue  # Removed, in flight, or rescheduled since this heap entry was pushed
+            entry["running"] = True
+            due.append(entry["item"])
+            if len(due) == 1:
+                metrics.set_gauge("schedule_lag_seconds", round(now - when, 3))  # Most overdue product
+        return due
+
+    def complete(self, item, result, finished=None):
+        """Record a finished check and schedule the product's next one from now"""
+        finished = time.time() if finished is None else finished
+        entry = self.entries.get(item["url"])
+        if entry is None:
+            return None  # Removed from items.json while it was being checked
+        entry["running"] = False
+
+        verdict = verdict_of(result)
+        if verdict is None:
+            entry["stable"] = 0  # Errors don't earn a longer interval
+        elif entry["verdict"] is not None and verdict != entry["verdict"]:
+            entry["last_change"] = finished
+            entry["stable"] = 0
+        else:
+            entry["stable"] += 1
+        if verdict is not None:
+            entry["verdict"] = verdict
+
+        entry["interval"] = self.interval_for(entry, finished)
+        delay = entry["interval"] * random.uniform(1 - JITTER, 1 + JITTER)
+        self.push(item["url"], finished + max(MIN_INTERVAL_SECONDS, delay))
+        return entry["interval"]
+
+    def interval_for(self, entry, now):
+        base = self.base_for(entry["item"])
+        if entry["item"].get("hot"):
+            return max(MIN_INTERVAL_SECONDS, min(base, HOT_INTERVAL_SECONDS))
+        if entry["last_change"] is not None and now - entry["last_change"] < RECENT_CHANGE_SECONDS:
+            return max(MIN_INTERVAL_SECONDS, min(base, HOT_INTERVAL_SECONDS))
+        extra = entry["stable"] - STABLE_CHECKS_BEFORE_BACKOFF
+        if extra > 0:
+            return min(MAX_INTERVAL_SECONDS, max(base, base * BACKOFF_FACTOR ** extra))
+        return base
+
+    def next_due(self):
+        """Time of the earliest scheduled check (None if nothing is scheduled)"""
+        while self.heap:
+            when, _, url = self.heap[0]
+            entry = self.entries.get(url)
+            if entry is not None and not entry["running"] and entry["due"] == when:
+                return when
+            heapq.heappop(self.heap)
+        return None
+
+    def running(self):
+        return sum(1 for entry in self.entries.values() if entry["running"])
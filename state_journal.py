@@ -0,0 +1,91 @@
+# state_journal.py - Alert state (notified / delivery_status) kept across restarts
+#
+# Every change is appended to an append-only journal as one short JSON line; the journal is
+# folded into a snapshot file once it grows, so startup reads one snapshot plus a short tail.
+import json
+import os
+
+# ====== CONFIG ======
+JOURNAL_FILE = "state.journal"
+SNAPSHOT_FILE = "state.snapshot.json"
+COMPACT_MIN_LINES = 1000  # Never compact a journal shorter than this
+COMPACT_RATIO = 2  # ...and compact once it has this many times more lines than the snapshot has keys
+
+
+class StateJournal:
+    """key -> (notified, delivery_status); writes cost O(changed keys), not O(all keys)"""
+
+    def __init__(self, journal_file=JOURNAL_FILE, snapshot_file=SNAPSHOT_FILE):
+        self.journal_file = journal_file
+        self.snapshot_file = snapshot_file
+        self.state = {}
+        self.pending = []  # Journal lines not yet written
+        self.journal_lines = 0
+
+    def load(self):
+        """Read the snapshot, then replay the journal on top of it"""
+        self.state = {}
+        try:
+            with open(self.snapshot_file, "r", encoding="utf-8") as f:
+                for key, (notified, delivery) in json.load(f).items():
+                    self.state[key] = (notified, delivery)
+        except (FileNotFoundError, json.JSONDecodeError):
+            pass
+
+        self.journal_lines = 0
+        try:
+            with open(self.journal_file, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # Torn last line after a crash
+                    self.journal_lines += 1
+                    if len(entry) == 1:
+                        self.state.pop(entry[0], None)
+                    else:
+                        self.state[entry[0]] = (entry[1], entry[2])
+        except FileNotFoundError:
+            pass
+        return dict(self.state)
+
+    def record(self, key, notified, delivery):
+        """Remember a key's state; only queued for writing if it differs from what's stored"""
+        value = (notified, delivery)
+        if self.state.get(key) == value:
+            return
+        self.state[key] = value
+        self.pending.append(json.dumps([key, notified, delivery], ensure_ascii=False))
+
+    def forget(self, keys):
+        """Drop keys (e.g. products removed from items.json)"""
+        for key in keys:
+            if key in self.state:
+                del self.state[key]
+                self.pending.append(json.dumps([key], ensure_ascii=False))
+
+    def flush(self):
+        """Append queued changes to the journal; compact it when it has grown large"""
+        if self.pending:
+            with open(self.journal_file, "a", encoding="utf-8") as f:
+                f.write("\n".join(self.pending) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_lines += len(self.pending)
+            self.pending = []
+
+        if self.journal_lines >= max(COMPACT_MIN_LINES, COMPACT_RATIO * len(self.state)):
+            self.compact()
+
+    def compact(self):
+        """Write the full state as a new snapshot and start an empty journal"""
+        tmp = self.snapshot_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({key: list(value) for key, value in self.state.items()}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.snapshot_file)
+        # Replaying old lines on top of the new snapshot is harmless (entries are absolute values),
+        # so a crash between these two steps loses nothing
+        open(self.journal_file, "w").close()
+        self.journal_lines = 0
@@ -1,6 +1,8 @@
 # stock_alert_selenium.py
 import json
 import time
+import queue
+import threading
 import schedule
 import requests
 import os
@@ -8,66 +10,241 @@ import sys
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 
-# ====== CONFIG ======
-ITEMS_FILE = "items.json"
-CHECK_INTERVAL_MIN = 1
-TELEGRAM_TOKEN = "8007630165:AAEBUZH0rjU3XPzx8JrUQ0DTeCKRKUmPXRw"
-TELEGRAM_CHAT_ID = "8186826029"
+import croma_api
+import metrics
+import page_cache
+import scheduler
+from proc_stats import process_tree_rss_mb
+from stock_core import (
+    CHECK_INTERVAL_MIN, DELIVERY_SELECTORS, DELIVERY_UNAVAILABLE_PHRASES, PRICE_SELECTORS, STOCK_REGION_SELECTORS,
+    load_items, evaluate_item, extract_price, report_result,
+    restore_state, flush_state, stop_notifier, record_sweep,
+    print_sweep_header, print_sweep_footer,
+)
 
-# Initialize Telegram bot using requests (more reliable)
-def send_telegram_message(text):
-    """Send message via Telegram Bot API using requests"""
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# ====== LEAN LOAD CONFIG ======
+LEAN_LOAD = True  # Block images/media/fonts/trackers and don't wait for them (detection reads text only)
+LEAN_WINDOW_SIZE = (1280, 800)  # Smaller than 1920x1080 but still Croma's desktop layout
+# Log requests/KB per product from Chrome's performance log (every CDP event is sent to the driver - off unless
+# you run with --measure-load; --lean-report always measures)
+MEASURE_LOAD = False
+# Images, media, fonts
+BLOCKED_EXTENSIONS = ["png", "jpg", "jpeg", "gif", "webp", "avif", "svg", "ico",
+                      "mp4", "webm", "m3u8", "mp3", "woff", "woff2", "ttf", "otf", "eot"]
+BLOCKED_URL_PATTERNS = [f"*.{ext}" for ext in BLOCKED_EXTENSIONS] + [f"*.{ext}?*" for ext in BLOCKED_EXTENSIONS] + [
+    # Analytics, ads and other third-party trackers
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+    "*googleadservices.com*", "*facebook.net*", "*facebook.com/tr*", "*connect.facebook*",
+    "*hotjar.com*", "*clarity.ms*", "*criteo.*", "*moengage.com*", "*branch.io*", "*app.link*",
+    "*nr-data.net*", "*newrelic.com*", "*bing.com/bat*", "*taboola.com*", "*outbrain.com*",
+    "*adobedtm.com*", "*omtrdc.net*", "*demdex.net*", "*youtube.com*", "*ytimg.com*",
+]
+
+
+def build_chrome_options(lean=LEAN_LOAD, measure=False):
+    """Chrome options (optimized for server/VPS hosting); measure=True records network use per page"""
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")  # Required for servers/VPS
+    options.add_argument("--disable-dev-shm-usage")  # Prevents /dev/shm issues on servers
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-software-rasterizer")
+    width, height = LEAN_WINDOW_SIZE if lean else (1920, 1080)
+    options.add_argument(f"--window-size={width},{height}")
+    options.add_argument("--disable-blink-features=AutomationControlled")
+    options.add_argument("--disable-logging")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--log-level=3")  # Suppress INFO, WARNING, ERROR messages
+    options.add_argument("--silent")
+    options.add_argument("--disable-setuid-sandbox")  # For server environments
+    options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
+    options.add_experimental_option('useAutomationExtension', False)
+    options.add_experimental_option("prefs", {
+        "logging.browser.enabled": False,
+        "logging.driver.enabled": False
+    })
+    options.add_argument(f"user-agent={USER_AGENT}")
+
+    if lean:
+        options.page_load_strategy = "eager"  # Return at DOMContentLoaded; wait_for_verdict() does the rest
+        options.add_argument("--blink-settings=imagesEnabled=false")
+    if measure:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return options
+
+
+# ====== BROWSER SESSION CONFIG ======
+SESSION_DIR = "browser_sessions"  # Cookies + localStorage per pincode, restored into every new Chrome
+SESSION_ORIGIN = "https://www.croma.com/"
+SESSION_DOMAIN = "croma.com"
+SESSION_PINCODE = croma_api.PINCODE  # The pincode the browser session is set up for (CROMA_PINCODE)
+SESSION_SAVE_SECONDS = 300
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "expiry", "sameSite")
+WARM_SPARES = 1  # Chromes kept started (session restored) to replace a crashed or recycled one instantly
+PAGE_LOAD_TIMEOUT = 30  # A hung page load fails instead of blocking a worker
+
+# ====== WORKER POOL CONFIG ======
+WORKER_COUNT = 2  # Chrome instances checking pages in parallel (roughly one per CPU core)
+WORKER_MAX_PAGES = 100  # Restart a worker's Chrome after this many pages
+WORKER_MAX_RSS_MB = 700  # Restart a worker's Chrome when its process tree uses more memory than this
+DEFAULT_WAIT_TIMEOUT = 10  # Max seconds to wait for a verdict; per item via "wait_timeout" in items.json
+WAIT_POLL_SECONDS = 0.2
+
+# Shared by READY_SCRIPT and REGION_SCRIPT, so the wait looks at exactly the text the verdict is read from
+REGION_JS = """
+function texts(els) {
+    var out = [], kept = [];
+    for (var i = 0; i < els.length; i++) {
+        var nested = false;
+        for (var j = 0; j < kept.length && !nested; j++) nested = kept[j].contains(els[i]);
+        if (nested) continue;  // Already part of a matched container
+        kept.push(els[i]);
+        var t = (els[i].innerText || "").toLowerCase();
+        if (t) out.push(t);
+    }
+    return out;
+}
+// The item's css_selector element, else the stock region containers; the whole page only if none exist
+// (containers that are on the page but still empty are waited for, not replaced by the whole page)
+function stockRegion(regionSelector, cssSelector) {
+    var els;
+    if (cssSelector) {
+        var el = document.querySelector(cssSelector);
+        els = el ? [el] : [];
+    } else {
+        els = document.querySelectorAll(regionSelector);
+    }
+    var fallback = els.length === 0;
+    var region = fallback ? [document.body ? (document.body.innerText || "").toLowerCase() : ""] : texts(els);
+    return {text: region.join("\\n"), fallback: fallback};
+}
+"""
+
+# Runs in the page: returns the first thing that settles the verdict, or false while still rendering.
+# An indicator elsewhere on the page (e.g. "Add to Cart" in a carousel) does not end the wait.
+READY_SCRIPT = REGION_JS + """
+var regionSelector = arguments[0], deliverySelector = arguments[1], cssSelector = arguments[2];
+var deliveryPhrases = arguments[3], indicators = arguments[4];
+var delivery = deliverySelector ? texts(document.querySelectorAll(deliverySelector)) : [];
+for (var i = 0; i < delivery.length; i++) {
+    for (var j = 0; j < deliveryPhrases.length; j++) {
+        if (delivery[i].indexOf(deliveryPhrases[j]) !== -1) return "delivery: " + deliveryPhrases[j];
+    }
+}
+var text = stockRegion(regionSelector, cssSelector).text;
+if (!cssSelector) text += "\\n" + delivery.join("\\n");  // evaluate_item() searches delivery text too
+for (var k = 0; k < indicators.length; k++) {
+    if (text.indexOf(indicators[k]) !== -1) return indicators[k];
+}
+return false;
+"""
+
+SAMPLE_CHARS = 500  # Text kept for "status unclear" output
+
+# Runs in the page: the stock region's, price's and delivery section's text plus a fingerprint of them.
+# If the fingerprint equals the one passed in, the text itself is not sent back.
+REGION_SCRIPT = REGION_JS + """
+var regionSelector = arguments[0], deliverySelector = arguments[1], cssSelector = arguments[2];
+var known = arguments[3], sampleChars = arguments[4], priceSelectors = arguments[5];
+var region = stockRegion(regionSelector, cssSelector), text = region.text, fallback = region.fallback;
+var delivery = texts(document.querySelectorAll(deliverySelector));
+var price = "";
+for (var p = 0; p < priceSelectors.length; p++) {  // In priority order, not document order
+    var priceEl = document.querySelector(priceSelectors[p]);
+    if (priceEl) { price = priceEl.innerText || ""; break; }
+}
+var all = text + "\\u0000" + price + "\\u0000" + delivery.join("\\u0000");
+// Two independent 32-bit hashes + length: the verdict can only change if this does
+var h1 = 0x811c9dc5, h2 = 5381;
+for (var i = 0; i < all.length; i++) {
+    var c = all.charCodeAt(i);
+    h1 = Math.imul(h1 ^ c, 0x01000193) >>> 0;
+    h2 = (Math.imul(h2, 33) + c) >>> 0;
+}
+var fingerprint = h1.toString(16) + "." + h2.toString(16) + ":" + all.length;
+if (fingerprint === known) return {fingerprint: fingerprint, fallback: fallback};
+return {fingerprint: fingerprint, fallback: fallback, text: text, delivery: delivery, price: price,
+        sample: text.substring(0, sampleChars)};
+"""
+
+# Runs in the page: all of its visible text (only read when the stock region gives no verdict)
+PAGE_TEXT_SCRIPT = "return document.body ? (document.body.innerText || '').toLowerCase() : '';"
+
+
+def create_driver(lean=LEAN_LOAD, measure=False):
+    """Start one headless Chrome (use system ChromeDriver - no webdriver_manager needed)"""
+    # Suppress Chrome/ChromeDriver output
+    service = Service()
+    service.log_path = os.devnull  # Suppress service logs
+    drv = webdriver.Chrome(service=service, options=build_chrome_options(lean, measure))
+    if lean:
+        drv.set_window_size(*LEAN_WINDOW_SIZE)
+        # Blocked requests fail inside Chrome before any bytes are fetched
+        drv.execute_cdp_cmd("Network.enable", {})
+        drv.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    else:
+        drv.set_window_size(1920, 1080)
+    drv.set_page_load_timeout(PAGE_LOAD_TIMEOUT)
+    drv.measure = measure
+    # Pincode serviceability calls go out with this browser's cookies (see pincode_matrix)
+    drv.api_session = requests.Session()
+    drv.api_session.headers["User-Agent"] = USER_AGENT
+    return drv
+
+
+def page_load_stats(driver):
+    """Requests made/blocked and bytes transferred since the last call (drains the performance log)"""
+    requests_made = 0
+    blocked = 0
+    bytes_loaded = 0
+    for entry in driver.get_log("performance"):
+        try:
+            message = json.loads(entry["message"])["message"]
+        except (KeyError, ValueError):
+            continue
+        method = message.get("method")
+        params = message.get("params", {})
+        if method == "Network.requestWillBeSent":
+            requests_made += 1
+        elif method == "Network.loadingFinished":
+            bytes_loaded += params.get("encodedDataLength", 0)
+        elif method == "Network.loadingFailed" and params.get("blockedReason"):
+            blocked += 1
+    return {"requests": requests_made, "blocked": blocked, "bytes": int(bytes_loaded)}
+
+
+def compare_lean_load(urls):
+    """Load each URL with a full and a lean Chrome and print what lean mode saves"""
+    full = create_driver(lean=False, measure=True)
+    lean = create_driver(lean=True, measure=True)
     try:
-        url = f"https://api.telegram.org/bot{TELEGRAM_TOKEN}/sendMessage"
-        payload = {
-            "chat_id": TELEGRAM_CHAT_ID,
-            "text": text,
-            "parse_mode": "HTML"
-        }
-        response = requests.post(url, json=payload, timeout=10)
-        response.raise_for_status()
-        return True
-    except Exception as e:
-        print(f"Telegram send failed: {e}")
-        return False
+        for url in urls:
+            row = {}
+            for label, drv in (("full", full), ("lean", lean)):
+                page_load_stats(drv)  # Discard anything logged before this page
+                started = time.time()
+                drv.get(url)
+                row[label] = dict(page_load_stats(drv), seconds=time.time() - started)
+            f, l = row["full"], row["lean"]
+            print(f"\n🔗 {url}")
+            print(f"  Full: {f['requests']} requests, {f['bytes'] / 1024:.0f} KB, {f['seconds']:.1f}s")
+            print(f"  Lean: {l['requests'] - l['blocked']} requests ({l['blocked']} blocked), "
+                  f"{l['bytes'] / 1024:.0f} KB, {l['seconds']:.1f}s")
+            print(f"  Saved: {f['requests'] - (l['requests'] - l['blocked'])} requests, "
+                  f"{(f['bytes'] - l['bytes']) / 1024:.0f} KB, {f['seconds'] - l['seconds']:.1f}s")
+    finally:
+        full.quit()
+        lean.quit()
 
-# Setup Chrome options (optimized for server/VPS hosting)
-chrome_options = Options()
-chrome_options.add_argument("--headless=new")
-chrome_options.add_argument("--no-sandbox")  # Required for servers/VPS
-chrome_options.add_argument("--disable-dev-shm-usage")  # Prevents /dev/shm issues on servers
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--disable-software-rasterizer")
-chrome_options.add_argument("--window-size=1920,1080")
-chrome_options.add_argument("--disable-blink-features=AutomationControlled")
-chrome_options.add_argument("--disable-logging")
-chrome_options.add_argument("--disable-extensions")
-chrome_options.add_argument("--log-level=3")  # Suppress INFO, WARNING, ERROR messages
-chrome_options.add_argument("--silent")
-chrome_options.add_argument("--disable-setuid-sandbox")  # For server environments
-chrome_options.add_argument("--remote-debugging-port=9222")  # For headless debugging
-chrome_options.add_experimental_option("excludeSwitches", ["enable-automation", "enable-logging"])
-chrome_options.add_experimental_option('useAutomationExtension', False)
-chrome_options.add_experimental_option("prefs", {
-    "logging.browser.enabled": False,
-    "logging.driver.enabled": False
-})
-chrome_options.add_argument("user-agent=Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36")
-
-# Suppress Chrome/ChromeDriver output
-service = Service()
-service.log_path = os.devnull  # Suppress service logs
-
-# Initialize driver (use system ChromeDriver - no webdriver_manager needed)
-driver = None
-try:
-    driver = webdriver.Chrome(service=service, options=chrome_options)
-    # Suppress console output from Chrome
-    driver.set_window_size(1920, 1080)
-    print("✅ ChromeDriver initialized successfully")
-    print("ℹ️  Chrome warnings are normal and can be ignored\n")
-except Exception as e:
+
+def print_driver_help(e):
+    """Explain how to get ChromeDriver working"""
     print(f"❌ Error initializing ChromeDriver: {e}")
     print("\nPlease ensure:")
     print("1. Google Chrome is installed")
@@ -80,182 +257,485 @@ except Exception as e:
     print("\n💡 RECOMMENDATION: Use stock_alert_simple.py for shared hosting!")
     print("   It works without Chrome and has the same features.")
 
-notified = {}  # Track if we've sent stock available notification
-delivery_status = {}  # Track delivery availability status: True = available, False = not available, None = unknown
+
+def driver_alive(driver):
+    """Cheap health check: does the browser still answer a trivial script?"""
+    try:
+        return driver.execute_script("return 1") == 1
+    except Exception:
+        return False
+
+
+def quit_driver(driver):
+    """Close a Chrome, ignoring errors from one that has already died"""
+    driver.api_session.close()
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+
+def session_file(pincode=SESSION_PINCODE):
+    return os.path.join(SESSION_DIR, f"{pincode}.json")
 
 
-def load_items():
-    """Load items from items.json file"""
-    with open(ITEMS_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+def save_session(driver, pincode=SESSION_PINCODE):
+    """Store the browser's cookies and localStorage (e.g. the chosen pincode) for SESSION_ORIGIN"""
+    if not driver.current_url.startswith(SESSION_ORIGIN):
+        return False  # localStorage belongs to the page's origin
+    data = {
+        "origin": SESSION_ORIGIN,
+        "cookies": driver.get_cookies(),
+        "local_storage": driver.execute_script(
+            "var d = {}; for (var i = 0; i < localStorage.length; i++) {"
+            " var k = localStorage.key(i); d[k] = localStorage.getItem(k); } return d;"),
+        "saved": time.time(),
+    }
+    write_session(data, pincode)
+    return True
+
+
+def write_session(data, pincode=SESSION_PINCODE):
+    os.makedirs(SESSION_DIR, exist_ok=True)
+    path = session_file(pincode)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def restore_session(driver, pincode=SESSION_PINCODE):
+    """Load the saved cookies and localStorage into a fresh browser; returns False if none are saved"""
+    try:
+        with open(session_file(pincode), "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return False
+    driver.get(data.get("origin", SESSION_ORIGIN))  # Cookies and storage can only be set for the open origin
+    for cookie in data.get("cookies", []):
+        cookie = {k: v for k, v in cookie.items() if k in COOKIE_FIELDS}
+        try:
+            driver.add_cookie(cookie)
+        except Exception:
+            pass  # Expired, or for another domain
+    driver.execute_script("var d = arguments[0]; for (var k in d) localStorage.setItem(k, d[k]);",
+                          data.get("local_storage", {}))
+    return True
+
+
+def import_session(path, pincode=SESSION_PINCODE):
+    """Use cookies exported from a desktop browser (a JSON list) as the session for pincode"""
+    with open(path, "r", encoding="utf-8") as f:
+        cookies = json.load(f)
+    cookies = [{k: v for k, v in cookie.items() if k in COOKIE_FIELDS}
+               for cookie in cookies if SESSION_DOMAIN in cookie.get("domain", "")]
+    write_session({"origin": SESSION_ORIGIN, "cookies": cookies, "local_storage": {}, "saved": time.time()}, pincode)
+    return len(cookies)
+
+
+def warm_driver():
+    """A new Chrome with the saved session already loaded"""
+    drv = create_driver(measure=MEASURE_LOAD)
+    try:
+        restore_session(drv)
+    except Exception as e:
+        print(f"  ⚠️  Could not restore the browser session: {e}")
+    if drv.measure:
+        page_load_stats(drv)  # Drop the homepage load, so the first product's stats are its own
+    return drv
+
+
+class WarmPool:
+    """Spare Chromes started in the background, so replacing a worker's browser never waits for a cold start"""
+
+    def __init__(self, spares=WARM_SPARES):
+        self.wanted = spares
+        self.spares = queue.Queue()
+        self.building = 0
+        self.lock = threading.Lock()
+
+    def refill(self):
+        """Start building spares until WARM_SPARES are ready or on the way"""
+        with self.lock:
+            missing = max(0, self.wanted - self.spares.qsize() - self.building)
+            self.building += missing
+        for _ in range(missing):
+            threading.Thread(target=self.build, name="warm-pool", daemon=True).start()
+
+    def build(self):
+        try:
+            drv = warm_driver()
+        except Exception as e:
+            print(f"  ❌ Could not pre-start a spare Chrome: {e}")
+            drv = None
+        with self.lock:
+            self.building -= 1
+            keep = drv is not None and self.wanted > 0
+        if keep:
+            self.spares.put(drv)
+        elif drv is not None:
+            quit_driver(drv)  # Pool closed meanwhile
+
+    def take(self):
+        """A ready spare if it's healthy, otherwise a browser started right now"""
+        drv = None
+        try:
+            drv = self.spares.get_nowait()
+        except queue.Empty:
+            pass
+        self.refill()
+        if drv is not None and driver_alive(drv):
+            return drv
+        if drv is not None:
+            quit_driver(drv)
+        return warm_driver()
+
+    def close(self):
+        with self.lock:
+            self.wanted = 0
+        while True:
+            try:
+                quit_driver(self.spares.get_nowait())
+            except queue.Empty:
+                return
+
+
+class BrowserWorker(threading.Thread):
+    """Owns one Chrome and checks items from the shared task queue"""
+
+    def __init__(self, number, tasks, results, pool):
+        super().__init__(name=f"browser-{number}", daemon=True)
+        self.number = number
+        self.tasks = tasks
+        self.results = results
+        self.pool = pool
+        self.driver = warm_driver()
+        self.pages = 0
+
+    def recycle(self, reason):
+        """Replace this worker's Chrome with a warm spare"""
+        print(f"  ♻️  Worker {self.number}: replacing Chrome ({reason})")
+        self.quit()
+        self.driver = self.pool.take()
+        self.pages = 0
+
+    def quit(self):
+        """Close this worker's Chrome"""
+        if self.driver:
+            quit_driver(self.driver)
+            self.driver = None
+
+    def memory_mb(self):
+        """Memory used by this worker's ChromeDriver + Chrome processes"""
+        try:
+            return process_tree_rss_mb(self.driver.service.process.pid)
+        except Exception:
+            return None
+
+    def check(self, item):
+        """check_item() on a healthy browser; a browser that dies mid-check is replaced and the item retried once"""
+        for attempt in (1, 2):
+            try:
+                if self.driver is None:
+                    self.driver = self.pool.take()
+                elif not driver_alive(self.driver):
+                    self.recycle("not responding")
+                return check_item(self.driver, item)
+            except Exception as e:
+                if attempt == 2 or (self.driver is not None and driver_alive(self.driver)):
+                    return {"error": e}  # A page problem, not a browser problem
+                print(f"  💥 Worker {self.number}: Chrome died ({type(e).__name__}) - retrying on a fresh one")
+                try:
+                    self.recycle("crashed")
+                except Exception as err:
+                    self.driver = None
+                    return {"error": err}
+
+    def save_session_now(self):
+        """Save cookies/localStorage every SESSION_SAVE_SECONDS (one worker at a time)"""
+        global session_saved_at
+        with session_lock:
+            if time.time() - session_saved_at < SESSION_SAVE_SECONDS:
+                return
+            session_saved_at = time.time()
+        try:
+            save_session(self.driver)
+        except Exception as e:
+            print(f"  ⚠️  Could not save the browser session: {e}")
+
+    def run(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:  # Shutdown signal
+                self.quit()
+                return
+            item = task
+            started = time.perf_counter()
+            result = self.check(item)
+            result["latency"] = time.perf_counter() - started
+            self.results.put((item, result))
+            if self.driver is not None and not result.get("error"):
+                self.save_session_now()
+
+            self.pages += 1
+            try:
+                if self.pages >= WORKER_MAX_PAGES:
+                    self.recycle(f"{self.pages} pages")
+                else:
+                    rss = self.memory_mb()
+                    if rss is not None and rss > WORKER_MAX_RSS_MB:
+                        self.recycle(f"{rss:.0f} MB used")
+            except Exception as e:
+                print(f"  ❌ Worker {self.number}: could not restart Chrome: {e}")
+                self.driver = None  # Retried on the next item
+
+
+tasks = queue.Queue()
+results = queue.Queue()
+workers = []
+warm_pool = WarmPool()
+session_lock = threading.Lock()
+session_saved_at = time.time()  # Don't overwrite the saved session before a page has been loaded
+
+
+def start_workers(count=WORKER_COUNT):
+    """Start the browser worker pool; returns False if no Chrome could be started"""
+    for number in range(1, count + 1):
+        try:
+            worker = BrowserWorker(number, tasks, results, warm_pool)
+        except Exception as e:
+            print_driver_help(e)
+            break
+        worker.start()
+        workers.append(worker)
+
+    if workers:
+        warm_pool.refill()
+        print(f"✅ ChromeDriver initialized successfully ({len(workers)} worker(s) + {warm_pool.wanted} warm spare(s))")
+        print("ℹ️  Chrome warnings are normal and can be ignored\n")
+    return bool(workers)
+
+
+def stop_workers():
+    """Ask every worker to close its Chrome and wait for them"""
+    for _ in workers:
+        tasks.put(None)
+    for worker in workers:
+        worker.join(timeout=30)
+    workers.clear()
+    warm_pool.close()
+
+
+def wait_for_verdict(driver, item):
+    """Wait until the stock region shows an indicator or delivery-unavailable text, up to the item's timeout
+
+    Returns what was found, or None if the timeout passed (the page is then checked as-is).
+    """
+    indicators = [ph.lower() for ph in item.get("available_indicators", []) + item.get("unavailable_indicators", [])]
+    css_selector = item.get("css_selector") if item.get("check_type") == "css" else None
+    # Items with "pincodes" take delivery from the API, so the page's delivery section doesn't settle them
+    delivery_selector = None if item.get("pincodes") else DELIVERY_SELECTORS
+    timeout = item.get("wait_timeout", DEFAULT_WAIT_TIMEOUT)
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=WAIT_POLL_SECONDS).until(
+            lambda d: d.execute_script(READY_SCRIPT, STOCK_REGION_SELECTORS, delivery_selector, css_selector,
+                                       DELIVERY_UNAVAILABLE_PHRASES, indicators)
+        )
+    except TimeoutException:
+        return None
+
+
+def check_item(driver, item):
+    """Load one product page in the given driver and return its verdict (see stock_core.evaluate_item)"""
+    url = item["url"]
+    with metrics.stage("navigate"):
+        driver.get(url)
+    with metrics.stage("wait"):
+        wait_for_verdict(driver, item)
+    load_stats = page_load_stats(driver) if getattr(driver, "measure", False) else None
+    result = read_verdict(driver, item)
+    if item.get("pincodes"):
+        with metrics.stage("pincodes"):
+            result = croma_api.with_pincodes(result, pincode_matrix(driver, item))
+    if load_stats:
+        result["load_stats"] = load_stats
+    return result
+
+
+def pincode_matrix(driver, item):
+    """Serviceability of the loaded product for each of the item's pincodes, using the browser's cookies
+
+    One API call per pincode instead of one page load per pincode.
+    """
+    session = driver.api_session
+    for cookie in driver.get_cookies():
+        session.cookies.set(cookie["name"], cookie["value"], domain=cookie.get("domain", ""),
+                            path=cookie.get("path", "/"))
+    return croma_api.check_matrix([item], session)[item["url"]]
+
+
+def extract_region(driver, item, known=None):
+    """Text of the stock region and delivery section in one in-page script (see REGION_SCRIPT)"""
+    css_selector = item.get("css_selector") if item.get("check_type") == "css" else None
+    return driver.execute_script(REGION_SCRIPT, STOCK_REGION_SELECTORS, DELIVERY_SELECTORS, css_selector,
+                                 known, SAMPLE_CHARS, PRICE_SELECTORS)
+
+
+def read_verdict(driver, item):
+    """Extract the stock/delivery text of the loaded page and evaluate it"""
+    url = item["url"]
+
+    # Same stock/delivery region as last time: reuse the verdict without re-evaluating
+    known = page_cache.cached_value(url, "region_fingerprint")
+    with metrics.stage("extract"):
+        region = extract_region(driver, item, known)
+    region_hash = page_cache.content_hash(page_cache.item_key(item), region["fingerprint"])
+    cached = page_cache.cached_result(url, "region_hash", region_hash)
+    if cached:
+        return cached
+    if "text" not in region:  # Region unchanged but the item's indicators were edited
+        with metrics.stage("extract"):
+            region = extract_region(driver, item)
+
+    # Items with "pincodes" get delivery per pincode from the API instead of the page's delivery section
+    delivery_texts = [] if item.get("pincodes") else region["delivery"]
+    fingerprint = region["fingerprint"]
+    with metrics.stage("match"):
+        result = evaluate_item(item, region["text"], delivery_texts)
+        if (result["avail"] is None and not result["delivery_unavailable"] and not region["fallback"]
+                and item.get("check_type") != "css"):
+            # No verdict in the region: search the whole page, like the HTTP checker. That verdict depends on
+            # more than the region, so it is not reused by region_hash.
+            result = evaluate_item(item, driver.execute_script(PAGE_TEXT_SCRIPT), delivery_texts)
+            region_hash = fingerprint = None
+    result["price"] = extract_price(region["price"])
+    if result["avail"] is None and not result["delivery_unavailable"]:
+        result["sample"] = region["sample"].replace("\n", " ")
+    page_cache.store_result(url, result, region_hash=region_hash, region_fingerprint=fingerprint)
+    return result
 
 
 def check_once():
-    """Check all items once for stock availability using Selenium"""
-    if not driver:
+    """Check all items once for stock availability using the Selenium worker pool"""
+    if not workers:
         print("Error: ChromeDriver not initialized. Cannot check items.")
         return
-    
+
+    started = time.time()
     items = load_items()
-    
-    print(f"\n{'='*70}")
-    print(f"📊 CHECKING {len(items)} PRODUCT(S) - {time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'='*70}")
-    
+    print_sweep_header(len(items))
+
+    # api items don't need a browser - they are answered by batched JSON calls
+    api_items = []
     for item in items:
-        name = item.get("name") or item.get("url")
-        url = item["url"]
-        
+        if item.get("check_type") == "api":
+            api_items.append(item)
+        else:
+            tasks.put(item)
+
+    # Results are merged into notified/delivery_status here, on the main thread only
+    api_results = croma_api.check_items(api_items)
+    for item in api_items:
+        report_result(item, api_results[item["url"]])
+
+    for _ in range(len(items) - len(api_items)):
+        item, result = results.get()
+        report_result(item, result)
+
+    flush_state()
+    page_cache.save_cache(keep_urls={item["url"] for item in items})
+    record_sweep(len(items), time.time() - started)
+    print_sweep_footer()
+
+
+def run_adaptive():
+    """Poll each product on its own schedule (see scheduler.py) until interrupted"""
+    plan = scheduler.AdaptiveScheduler(CHECK_INTERVAL_MIN * 60)
+    items = None  # Item list the plan was last synced with
+    while True:
+        latest = load_items()
+        if latest is not items:  # The registry returns the same list until items.json changes
+            items = latest
+            plan.sync(items)
+
+        due = plan.pop_due()
+        if due:
+            print(f"\n⏰ {time.strftime('%H:%M:%S')} - checking {len(due)} due product(s)")
+            api_items = [item for item in due if item.get("check_type") == "api"]
+            for item in due:
+                if item.get("check_type") != "api":
+                    tasks.put(item)
+            # api items don't need a browser - answered right here by batched JSON calls
+            api_results = croma_api.check_items(api_items)
+            for item in api_items:
+                report_result(item, api_results[item["url"]])
+                plan.complete(item, api_results[item["url"]])
+
+        # Wait for a worker result, the next due product, or 1s (to notice items.json edits)
+        next_due = plan.next_due()
+        timeout = 1.0 if next_due is None else min(1.0, max(0.05, next_due - time.time()))
+        finished = 0
         try:
-            driver.get(url)
-            time.sleep(3)  # wait for JS to render; increase if needed
-            
-            # STEP 1: FIRST CHECK DELIVERY AVAILABILITY (HIGHEST PRIORITY)
-            delivery_unavailable = False
-            delivery_text = ""
-            
-            try:
-                # Check delivery section specifically for "Not Available"
-                delivery_elements = driver.find_elements("css selector", ".delivery-not-available, .not-available-color, .cp-ship-opt, .delivery-option-margin")
-                for elem in delivery_elements:
-                    elem_text = elem.text.lower()
-                    if elem_text:
-                        delivery_text += " " + elem_text
-                        # Check for delivery unavailable indicators
-                        delivery_unavailable_phrases = ["not available", "not available for", "not available at", "delivery not available"]
-                        for phrase in delivery_unavailable_phrases:
-                            if phrase in elem_text:
-                                delivery_unavailable = True
-                                break
-                        if delivery_unavailable:
-                            break
-            except Exception:
-                pass  # Continue if delivery section not found
-            
-            # If delivery is not available, mark as unavailable immediately
-            if delivery_unavailable:
-                avail = False
-                matched_indicator = "Delivery Not Available"
-                
-                # Check if delivery status changed (to notify only once)
-                prev_delivery_status = delivery_status.get(url)
-                
-                if prev_delivery_status is not False:  # First time or changed from available
-                    msg = f"🚚 DELIVERY NOT AVAILABLE\n\n📦 Product: {name}\n❌ Delivery Not Available for your pincode\n🔗 {url}\n\n⏳ Monitoring... Will notify when delivery becomes available!"
-                    print(f"\n[{name}]")
-                    print(f"  🚚 Delivery: ❌ NOT AVAILABLE (for your pincode)")
-                    print(f"  📦 Stock: ❌ Cannot determine (delivery unavailable)")
-                    print(f"  📢 Status: Notification sent via Telegram")
-                    send_telegram_message(msg)
-                else:
-                    print(f"\n[{name}]")
-                    print(f"  🚚 Delivery: ❌ NOT AVAILABLE (for your pincode)")
-                    print(f"  📦 Stock: ❌ Cannot determine (delivery unavailable)")
-                    print(f"  📢 Status: Monitoring...")
-                
-                delivery_status[url] = False  # Update delivery status
-            else:
-                # STEP 2: Get text content from page for other indicators
-                if item.get("check_type") == "css":
-                    try:
-                        el = driver.find_element("css selector", item["css_selector"])
-                        txt = el.text.lower()
-                    except Exception:
-                        txt = driver.page_source.lower()
-                else:
-                    txt = driver.page_source.lower()
-                    # Include delivery text in the search
-                    if delivery_text:
-                        txt += " " + delivery_text
-                
-                avail = None
-                matched_indicator = None
-                
-                # Check for available indicators (only if delivery is available)
-                for ph in item.get("available_indicators", []):
-                    if ph.lower() in txt:
-                        avail = True
-                        matched_indicator = ph
-                        break
-                
-                # Check for unavailable indicators (only if available indicators not found)
-                if avail is None:
-                    for ph in item.get("unavailable_indicators", []):
-                        if ph.lower() in txt:
-                            avail = False
-                            matched_indicator = ph
-                            break
-            
-            # Update delivery status if delivery is available
-            prev = notified.get(url, False)
-            
-            # Print detailed status for this product
-            if not delivery_unavailable:
-                prev_delivery_status = delivery_status.get(url)
-                if prev_delivery_status is False:  # Delivery was unavailable, now available
-                    msg = f"✅ DELIVERY NOW AVAILABLE!\n\n📦 Product: {name}\n🚚 Delivery is now available for your pincode\n🔗 {url}\n\n✨ You can now purchase this product!"
-                    print(f"\n[{name}]")
-                    print(f"  🚚 Delivery: ✅ NOW AVAILABLE!")
-                    print(f"  📢 Status: Notification sent via Telegram")
-                    send_telegram_message(msg)
-                    delivery_status[url] = True
-                else:
-                    print(f"\n[{name}]")
-                    print(f"  🚚 Delivery: ✅ Available")
-                    delivery_status[url] = True
-                
-                if avail is True and not prev:
-                    msg = f"✅ STOCK ALERT: {name}\n🎉 Product is in stock!\n{url}"
-                    print(f"  📦 Stock: ✅ IN STOCK!")
-                    print(f"  🔍 Matched: {matched_indicator or 'Available indicator found'}")
-                    print(f"  📢 Status: 🚨 STOCK ALERT - Notification sent!")
-                    send_telegram_message(msg)
-                    notified[url] = True
-                elif avail is True and prev:
-                    print(f"  📦 Stock: ✅ IN STOCK")
-                    print(f"  🔍 Matched: {matched_indicator or 'Available indicator found'}")
-                    print(f"  📢 Status: Already notified (stock still available)")
-                elif avail is False:
-                    notified[url] = False
-                    print(f"  📦 Stock: ❌ OUT OF STOCK")
-                    print(f"  🔍 Matched: {matched_indicator or 'Unavailable indicator found'}")
-                    print(f"  📢 Status: Monitoring...")
-                else:
-                    # Status unclear - show some context for debugging
-                    page_text_sample = driver.find_element("tag name", "body").text[:500].replace("\n", " ")
-                    print(f"  📦 Stock: ⚠️  STATUS UNCLEAR")
-                    print(f"  🔍 Looking for: {item.get('available_indicators', []) + item.get('unavailable_indicators', [])}")
-                    print(f"  📝 Page sample: {page_text_sample[:100]}...")
-        
-        except Exception as e:
-            print(f"\n[{name}]")
-            print(f"  ❌ Error: {e}")
-            print(f"  📢 Status: Failed to check")
-    
-    print(f"\n{'='*70}")
-    print(f"✅ CHECK COMPLETE - {time.strftime('%H:%M:%S')}")
-    print(f"{'='*70}\n")
+            item, result = results.get(timeout=timeout)
+            while True:
+                report_result(item, result)
+                plan.complete(item, result)
+                finished += 1
+                item, result = results.get_nowait()
+        except queue.Empty:
+            pass
+        if finished or due:
+            flush_state()
+            page_cache.save_cache(keep_urls=set(plan.entries))
 
 
 if __name__ == "__main__":
-    if not driver:
+    if "--lean-report" in sys.argv:
+        # python stock_alert_selenium.py --lean-report [URL ...]  (default: every page in items.json)
+        urls = sys.argv[sys.argv.index("--lean-report") + 1:] or [item["url"] for item in load_items()]
+        compare_lean_load(urls)
+        sys.exit(0)
+
+    if "--import-session" in sys.argv:
+        # python stock_alert_selenium.py --import-session cookies.json  (cookies exported from your browser
+        # after choosing the pincode on croma.com; saved for CROMA_PINCODE)
+        count = import_session(sys.argv[sys.argv.index("--import-session") + 1])
+        print(f"✅ Saved {count} croma.com cookie(s) as the browser session for pincode {SESSION_PINCODE}")
+        sys.exit(0)
+
+    if "--measure-load" in sys.argv:
+        MEASURE_LOAD = True
+
+    # --flat: the old behaviour - every product, every CHECK_INTERVAL_MIN minutes
+    flat = "--flat" in sys.argv
+
+    if not start_workers():
         print("Cannot start: ChromeDriver not available.")
         exit(1)
-    
+
     print(f"\nStarting stock monitor...")
-    print(f"Checking every {CHECK_INTERVAL_MIN} minutes...")
+    if flat:
+        print(f"Checking every {CHECK_INTERVAL_MIN} minutes...")
+    else:
+        print(f"Checking each product every ~{CHECK_INTERVAL_MIN} minutes (hot / recently changed more often)...")
     print("Press Ctrl+C to stop.\n")
-    
-    check_once()  # first run immediately
-    
-    schedule.every(CHECK_INTERVAL_MIN).minutes.do(check_once)
-    
+
+    restore_state()
+    page_cache.load_cache()
+    metrics.start()
+
     try:
-        while True:
-            schedule.run_pending()
-            time.sleep(1)
+        if flat:
+            check_once()  # first run immediately
+            schedule.every(CHECK_INTERVAL_MIN).minutes.do(check_once)
+            while True:
+                schedule.run_pending()
+                time.sleep(1)
+        else:
+            run_adaptive()
     except KeyboardInterrupt:
         print("\nStopping monitor...")
-        if driver:
-            driver.quit()
+        flush_state()
+        stop_notifier()
+        stop_workers()
         print("Done!")
@@ -0,0 +1,287 @@
+# stock_alert_simple.py - Browserless stock checker (requests + lxml), same items.json as Selenium
+import multiprocessing
+import os
+import sys
+import time
+import threading
+import schedule
+import requests
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+
+import croma_api
+import metrics
+import page_cache
+import page_extract
+import scheduler
+from stock_core import (
+    CHECK_INTERVAL_MIN, DELIVERY_SELECTORS, PRICE_SELECTORS, STOCK_REGION_SELECTORS, load_items, evaluate_item,
+    extract_price, report_result,
+    restore_state, flush_state, stop_notifier, record_sweep,
+    print_sweep_header, print_sweep_footer,
+)
+
+# ====== CONFIG ======
+MAX_WORKERS = 32  # Pages fetched at the same time (all hosts together)
+MAX_PER_HOST = 8  # Pages fetched at the same time from one host (also the keep-alive pool size)
+REQUEST_TIMEOUT = 15  # Seconds per page
+# Processes parsing pages: parsing is CPU-bound, so in the fetch threads it would run one page at a time
+# (the GIL). One core is left for fetching; 0 = parse in the fetch threads.
+PARSE_PROCESSES = max(0, (os.cpu_count() or 1) - 1)
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+# One keep-alive session shared by every worker thread
+session = requests.Session()
+session.headers.update({
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-IN,en;q=0.9",
+})
+adapter = HTTPAdapter(pool_connections=16, pool_maxsize=MAX_PER_HOST)
+session.mount("https://", adapter)
+session.mount("http://", adapter)
+
+parse_pool = None  # ProcessPoolExecutor running page_extract.extract_page (see start_parse_pool)
+
+host_limits = {}  # host -> semaphore limiting concurrent requests to that host
+host_limits_lock = threading.Lock()
+
+
+def host_semaphore(url):
+    """Return the per-host concurrency semaphore for a URL"""
+    host = urlparse(url).netloc
+    with host_limits_lock:
+        sem = host_limits.get(host)
+        if sem is None:
+            sem = threading.BoundedSemaphore(MAX_PER_HOST)
+            host_limits[host] = sem
+        return sem
+
+
+def fetch_page(url, conditional=True):
+    """Fetch a page through the pooled session, respecting the per-host limit
+
+    Sends the stored ETag / Last-Modified; returns None when the server answers 304 Not Modified.
+    """
+    headers = page_cache.conditional_headers(url) if conditional else {}
+    with host_semaphore(url), metrics.stage("navigate"):
+        response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+    if response.status_code == 304:
+        return None
+    response.raise_for_status()
+    page_cache.remember_validators(url, response.headers)
+    return response.text
+
+
+def start_parse_pool(processes=PARSE_PROCESSES):
+    """Start the page-parsing processes - early, while this process has few threads, since they are forked"""
+    global parse_pool
+    if processes <= 0 or parse_pool is not None:
+        return
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    parse_pool = ProcessPoolExecutor(processes, mp_context=context, initializer=page_extract.ignore_interrupts)
+    parse_pool.submit(int).result()  # Starts the processes now rather than on the first page
+
+
+def stop_parse_pool():
+    global parse_pool
+    if parse_pool is not None:
+        parse_pool.shutdown(cancel_futures=True)
+        parse_pool = None
+
+
+def parse_page(html, item):
+    """page_extract.extract_page() for an item, in a parse process if they are running"""
+    args = (
+        html,
+        STOCK_REGION_SELECTORS,
+        # Items with "pincodes" get delivery per pincode from the API instead of the page's delivery section
+        None if item.get("pincodes") else DELIVERY_SELECTORS,
+        PRICE_SELECTORS,
+        item.get("css_selector") if item.get("check_type") == "css" else None,
+    )
+    if parse_pool is None:
+        return page_extract.extract_page(*args)
+    return parse_pool.submit(page_extract.extract_page, *args).result()
+
+
+def check_item(item):
+    """Fetch and parse one product page and return its verdict (see stock_core.evaluate_item)"""
+    url = item["url"]
+    item_hash = page_cache.content_hash(page_cache.item_key(item))
+    html = fetch_page(url)
+    if html is None:
+        cached = page_cache.cached_result(url, "item_hash", item_hash)
+        if cached:
+            return cached
+        html = fetch_page(url, conditional=False)
+
+    # Byte-identical page: reuse the last verdict without parsing
+    body_hash = page_cache.content_hash(page_cache.item_key(item), html)
+    cached = page_cache.cached_result(url, "body_hash", body_hash)
+    if cached:
+        return cached
+
+    with metrics.stage("extract"):
+        page = parse_page(html, item)
+    region = page["text"]
+    delivery_texts = page["delivery"]
+    price_text = page["price"]
+
+    # Same stock/delivery region (e.g. only a nonce, timestamp or tracking token changed): skip evaluation.
+    # Pages without the region are only reused when byte-identical (body_hash above).
+    region_hash = None
+    if region is not None:
+        region_hash = page_cache.content_hash(page_cache.item_key(item), region, price_text, *delivery_texts)
+        cached = page_cache.cached_result(url, "region_hash", region_hash)
+        if cached:
+            # The new body hash is not stored: a page that gets here usually changes on every load, so it
+            # would never match again and would only make save_cache() rewrite the file
+            return cached
+
+    with metrics.stage("match"):
+        result = None if region is None else evaluate_item(item, region, delivery_texts)
+        if result is None or (result["avail"] is None and not result["delivery_unavailable"]
+                              and item.get("check_type") != "css"):
+            # No verdict in the region: search the raw page (e.g. a buy box filled in by a script). That
+            # verdict depends on more than the region, so it is not reused by region_hash.
+            result = evaluate_item(item, html.lower(), delivery_texts)
+            region_hash = None
+    result["price"] = extract_price(price_text)
+    if result["avail"] is None and not result["delivery_unavailable"]:
+        result["sample"] = page["sample"]
+    page_cache.store_result(url, result, body_hash=body_hash, region_hash=region_hash, item_hash=item_hash)
+    return result
+
+
+def safe_check_item(item):
+    """check_item() plus the item's pincode delivery matrix; exceptions become error results"""
+    started = time.perf_counter()
+    try:
+        result = check_item(item)
+        if item.get("pincodes"):
+            with metrics.stage("pincodes"):
+                result = croma_api.with_pincodes(result, croma_api.check_matrix([item], session)[item["url"]])
+    except Exception as e:
+        result = {"error": e}
+    result["latency"] = time.perf_counter() - started
+    return result
+
+
+def check_once():
+    """Check all items once for stock availability, fetching pages concurrently"""
+    items = load_items()
+    print_sweep_header(len(items))
+
+    started = time.time()
+    api_items = [item for item in items if item.get("check_type") == "api"]
+    page_items = [item for item in items if item.get("check_type") != "api"]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(MAX_WORKERS, len(items)))) as pool:
+        # api items go out as batched JSON calls alongside the page fetches
+        api_futures = [pool.submit(croma_api.check_items, batch, croma_api.PINCODE, session)
+                       for batch in croma_api.batches(api_items)]
+        page_results = pool.map(safe_check_item, page_items)
+
+        results = {}
+        for item, result in zip(page_items, page_results):
+            results[item["url"]] = result
+        for future in api_futures:
+            results.update(future.result())
+
+    # Report in items.json order so the log reads the same as the Selenium checker
+    for item in items:
+        report_result(item, results[item["url"]])
+
+    flush_state()
+    page_cache.save_cache(keep_urls={item["url"] for item in items})
+    print(f"\n⏱️  Fetched {len(items)} product(s) in {time.time() - started:.1f}s")
+    record_sweep(len(items), time.time() - started)
+    print_sweep_footer()
+
+
+def submit_due(pool, items):
+    """Start checks for due items; returns {future: [items]} (each future yields {url: result})"""
+    submitted = {}
+    api_items = [item for item in items if item.get("check_type") == "api"]
+    for batch in croma_api.batches(api_items):
+        submitted[pool.submit(croma_api.check_items, batch, croma_api.PINCODE, session)] = batch
+    for item in items:
+        if item.get("check_type") != "api":
+            future = pool.submit(lambda it: {it["url"]: safe_check_item(it)}, item)
+            submitted[future] = [item]
+    return submitted
+
+
+def run_adaptive():
+    """Poll each product on its own schedule (see scheduler.py) until interrupted"""
+    plan = scheduler.AdaptiveScheduler(CHECK_INTERVAL_MIN * 60)
+    items = None  # Item list the plan was last synced with
+    in_flight = {}
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        while True:
+            latest = load_items()
+            if latest is not items:  # The registry returns the same list until items.json changes
+                items = latest
+                plan.sync(items)
+
+            due = plan.pop_due()
+            if due:
+                print(f"\n⏰ {time.strftime('%H:%M:%S')} - checking {len(due)} due product(s)")
+                in_flight.update(submit_due(pool, due))
+
+            # Sleep until a check finishes, the next product is due, or 1s passes (to notice items.json edits)
+            next_due = plan.next_due()
+            timeout = 1.0 if next_due is None else min(1.0, max(0.0, next_due - time.time()))
+            if in_flight:
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+            else:
+                done = []
+                time.sleep(timeout)
+
+            for future in done:
+                batch = in_flight.pop(future)
+                results = future.result()
+                for item in batch:
+                    result = results.get(item["url"], {"error": "no result"})
+                    report_result(item, result)
+                    plan.complete(item, result)
+            if done:
+                flush_state()
+                page_cache.save_cache(keep_urls=set(plan.entries))
+
+
+if __name__ == "__main__":
+    # --flat: the old behaviour - every product, every CHECK_INTERVAL_MIN minutes
+    flat = "--flat" in sys.argv
+
+    print(f"\nStarting stock monitor (simple HTTP mode)...")
+    if flat:
+        print(f"Checking every {CHECK_INTERVAL_MIN} minutes...")
+    else:
+        print(f"Checking each product every ~{CHECK_INTERVAL_MIN} minutes (hot / recently changed more often)...")
+    print("Press Ctrl+C to stop.\n")
+
+    start_parse_pool()  # Before restore_state()/metrics.start() start threads
+    restore_state()
+    page_cache.load_cache()
+    metrics.start()
+
+    try:
+        if flat:
+            check_once()  # first run immediately
+            schedule.every(CHECK_INTERVAL_MIN).minutes.do(check_once)
+            while True:
+                schedule.run_pending()
+                time.sleep(1)
+        else:
+            run_adaptive()
+    except KeyboardInterrupt:
+        print("\nStopping monitor...")
+        flush_state()
+        stop_notifier()
+        stop_parse_pool()
+        session.close()
+        print("Done!")
@@ -0,0 +1,405 @@
+# stock_core.py - Shared config, Telegram and stock/delivery verdict logic for both checkers
+import json
+import re
+import time
+
+import history
+import indicator_matcher
+import item_registry
+import item_store
+import metrics
+import notifier
+import state_journal
+
+# ====== CONFIG ======
+ITEMS_FILE = "items.json"
+CHECK_INTERVAL_MIN = 1
+TELEGRAM_TOKEN = "8007630165:AAEBUZH0rjU3XPzx8JrUQ0DTeCKRKUmPXRw"
+TELEGRAM_CHAT_ID = "8186826029"
+
+# Delivery section of a Croma product page
+DELIVERY_SELECTORS = ".delivery-not-available, .not-available-color, .cp-ship-opt, .delivery-option-margin"
+DELIVERY_UNAVAILABLE_PHRASES = ["not available", "not available for", "not available at", "delivery not available"]
+# Buy-box / price / add-to-cart area of a Croma product page (its text is what indicators match);
+# the whole page is only searched when they give no verdict
+STOCK_REGION_SELECTORS = (".pdp-right-section, .pd-right-section, .cp-product-typ-right, .product-info, "
+                          ".cp-add-to-cart, .pdp-cta-section, .cp-price-section")
+# Selling price of a Croma product page (recorded in the check history, see history.py). Tried one at a time in
+# this order: a selector list would match in document order, so a header/EMI/carousel price could come first
+PRICE_SELECTORS = [".pdp-price .amount", ".cp-price-section .amount", ".new-price", "#pdp-product-price"]
+PRICE_PATTERN = re.compile(r"(?:₹|\brs\.?|\binr)\s*([\d,]+)", re.IGNORECASE)
+
+notified = {}  # Track if we've sent stock available notification
+# Track delivery availability status: True = available, False = not available, None = unknown.
+# Keyed by url, and by pincode_key(url, pincode) for items with "pincodes"
+delivery_status = {}
+
+
+# Alerts are queued and sent by a background thread (see notifier.py), so a slow
+# Telegram API never holds up checking
+telegram = notifier.TelegramDispatcher(TELEGRAM_TOKEN, TELEGRAM_CHAT_ID)
+
+# Every check's outcome, written with the alert state at the end of each sweep
+check_history = history.HistoryStore()
+
+
+def send_telegram_message(text):
+    """Queue a message for the Telegram chat; returns immediately"""
+    return telegram.enqueue(text)
+
+
+def stop_notifier():
+    """Give queued alerts a few seconds to go out before exiting (the rest are kept for next start)"""
+    telegram.stop(timeout=10)
+
+
+def pincode_key(url, pincode):
+    """State key for one product at one pincode"""
+    return f"{url}|{pincode}"
+
+
+def is_stale(key):
+    """True if a state key belongs to a product (or pincode of a product) no longer in items.json"""
+    url, sep, pincode = key.rpartition("|")
+    if not sep:
+        return key not in registry
+    item = registry.get(url)
+    return item is None or pincode not in [str(p) for p in item.get("pincodes", [])]
+
+
+def forget_removed_items(added, removed, changed):
+    """Drop alert state of products (and pincodes) that were taken out of items.json"""
+    stale = {item.get("url") for item in removed}
+    if removed or changed:
+        stale |= {key for key in set(notified) | set(delivery_status) if is_stale(key)}
+    for key in stale:
+        notified.pop(key, None)
+        delivery_status.pop(key, None)
+    state_store.forget(stale)
+    # Every reload: the matcher is compiled once per distinct indicator set, the phrases lowercased once per item
+    indicator_matcher.use_items(registry.items)
+
+
+if item_store.ITEMS_BACKEND == "sqlite":
+    registry = item_store.SqliteRegistry(item_store.DB_FILE)
+    state_store = item_store.SqliteStateStore(registry.conn)
+else:
+    registry = item_registry.ItemRegistry(ITEMS_FILE)
+    state_store = state_journal.StateJournal()
+registry.listeners.append(forget_removed_items)
+
+
+def restore_state():
+    """Load notified/delivery_status saved by the previous run, so a restart doesn't re-send alerts"""
+    load_items()
+    saved = state_store.load()
+    stale = {key for key in saved if is_stale(key)}  # Products removed while we were stopped
+    state_store.forget(stale)
+    for key, (was_notified, delivery) in saved.items():
+        if key in stale:
+            continue
+        if was_notified is not None:
+            notified[key] = was_notified
+        if delivery is not None:
+            delivery_status[key] = delivery
+    telegram.start()  # Delivers anything left in the queue by the last run
+    if notified or delivery_status:
+        print(f"💾 Restored alert state for {len(set(notified) | set(delivery_status))} product(s)")
+
+
+def flush_state():
+    """Persist the state changes of this sweep (only changed products are written)"""
+    try:
+        with metrics.stage("state_write"):
+            state_store.flush()
+    except Exception as e:
+        print(f"⚠️  Could not save alert state: {e}")
+    try:
+        with metrics.stage("history_write"):
+            check_history.flush()
+    except Exception as e:
+        print(f"⚠️  Could not write check history: {e}")
+
+
+def load_items():
+    """Items from items.json (or items.db) - only re-read when it changed since the last call"""
+    try:
+        diff = registry.refresh()
+    except json.JSONDecodeError as e:
+        if not registry.items:
+            raise
+        print(f"⚠️  {ITEMS_FILE} is not valid JSON ({e}) - still using the previous {len(registry.items)} item(s)")
+        return registry.items
+    if diff:
+        added, removed, changed = diff
+        if removed or changed or len(added) != len(registry.items):
+            print(f"📝 {ITEMS_FILE} reloaded: +{len(added)} / -{len(removed)} / ~{len(changed)} product(s)")
+    return registry.items
+
+
+def evaluate_item(item, txt, delivery_texts):
+    """Decide delivery and stock verdict from already extracted, lowercased page text
+
+    delivery_texts is the lowercased text of each element matching DELIVERY_SELECTORS.
+    Returns a result dict understood by report_result().
+    """
+    # STEP 1: FIRST CHECK DELIVERY AVAILABILITY (HIGHEST PRIORITY)
+    delivery_text = ""
+    for elem_text in delivery_texts:
+        if elem_text:
+            delivery_text += " " + elem_text
+            for phrase in DELIVERY_UNAVAILABLE_PHRASES:
+                if phrase in elem_text:
+                    return {"delivery_unavailable": True, "avail": False, "matched": "Delivery Not Available"}
+
+    # STEP 2: Look for stock indicators (delivery text is searched too for text checks)
+    if item.get("check_type") != "css" and delivery_text:
+        txt += " " + delivery_text
+
+    # One scan of the page finds every indicator; the item's list order still decides the winner
+    matcher, available, unavailable = indicator_matcher.phrases_for(item)
+    found = matcher.scan(txt)
+
+    avail = None
+    matched_indicator = None
+
+    # Check for available indicators (only if delivery is available)
+    for ph, lowered in available:
+        if lowered in found:
+            avail = True
+            matched_indicator = ph
+            break
+
+    # Check for unavailable indicators (only if available indicators not found)
+    if avail is None:
+        for ph, lowered in unavailable:
+            if lowered in found:
+                avail = False
+                matched_indicator = ph
+                break
+
+    return {"delivery_unavailable": False, "avail": avail, "matched": matched_indicator}
+
+
+def extract_price(text):
+    """Whole rupees of the first price in text (e.g. "₹69,900.00" -> 69900), or None"""
+    match = PRICE_PATTERN.search(text or "")
+    if not match:
+        return None
+    digits = match.group(1).replace(",", "")
+    return int(digits) if digits else None
+
+
+def report_result(item, result):
+    """Print the status of one checked item, update state and send Telegram alerts"""
+    url = item["url"]
+    show_and_alert(item, result)
+    print_load_stats(result)
+    record_check(item, result)
+    check_history.record(item, result)
+    state_store.record(url, notified.get(url), delivery_status.get(url))
+    for pincode in result.get("pincodes", {}):
+        key = pincode_key(url, pincode)
+        state_store.record(key, None, delivery_status.get(key))
+
+
+def show_and_alert(item, result):
+    """Print one item's status and send any alert its state change calls for"""
+    name = item.get("name") or item.get("url")
+    url = item["url"]
+
+    if result.get("error"):
+        print(f"\n[{name}]")
+        print(f"  ❌ Error: {result['error']}")
+        print(f"  📢 Status: Failed to check")
+        return
+
+    # Page unchanged since a check made by this process: nothing to evaluate or notify
+    if result.get("unchanged") and url in delivery_status:
+        print(f"\n[{name}]")
+        print(f"  💤 Unchanged since last check")
+        return
+
+    if "pincodes" in result:
+        print(f"\n[{name}]")
+        show_pincodes(item, result)
+        if result["delivery_unavailable"]:
+            print(f"  📦 Stock: ❌ Cannot determine (delivery unavailable for every pincode)")
+        else:
+            show_stock(item, result)
+        return
+
+    # If delivery is not available, mark as unavailable immediately
+    if result["delivery_unavailable"]:
+        # Check if delivery status changed (to notify only once)
+        prev_delivery_status = delivery_status.get(url)
+
+        if prev_delivery_status is not False:  # First time or changed from available
+            msg = f"🚚 DELIVERY NOT AVAILABLE\n\n📦 Product: {name}\n❌ Delivery Not Available for your pincode\n🔗 {url}\n\n⏳ Monitoring... Will notify when delivery becomes available!"
+            print(f"\n[{name}]")
+            print(f"  🚚 Delivery: ❌ NOT AVAILABLE (for your pincode)")
+            print(f"  📦 Stock: ❌ Cannot determine (delivery unavailable)")
+            print(f"  📢 Status: Notification sent via Telegram")
+            send_telegram_message(msg)
+        else:
+            print(f"\n[{name}]")
+            print(f"  🚚 Delivery: ❌ NOT AVAILABLE (for your pincode)")
+            print(f"  📦 Stock: ❌ Cannot determine (delivery unavailable)")
+            print(f"  📢 Status: Monitoring...")
+
+        delivery_status[url] = False  # Update delivery status
+        return
+
+    # Delivery is available - notify if it was unavailable before
+    prev_delivery_status = delivery_status.get(url)
+    if prev_delivery_status is False:  # Delivery was unavailable, now available
+        msg = f"✅ DELIVERY NOW AVAILABLE!\n\n📦 Product: {name}\n🚚 Delivery is now available for your pincode\n🔗 {url}\n\n✨ You can now purchase this product!"
+        print(f"\n[{name}]")
+        print(f"  🚚 Delivery: ✅ NOW AVAILABLE!")
+        print(f"  📢 Status: Notification sent via Telegram")
+        send_telegram_message(msg)
+        delivery_status[url] = True
+    else:
+        print(f"\n[{name}]")
+        print(f"  🚚 Delivery: ✅ Available")
+        delivery_status[url] = True
+
+    show_stock(item, result)
+
+
+def show_stock(item, result):
+    """Print the stock part of an item's status and send the in-stock alert once"""
+    name = item.get("name") or item.get("url")
+    url = item["url"]
+    avail = result["avail"]
+    matched_indicator = result["matched"]
+    prev = notified.get(url, False)
+
+    if avail is True and not prev:
+        msg = f"✅ STOCK ALERT: {name}\n🎉 Product is in stock!\n{url}"
+        print(f"  📦 Stock: ✅ IN STOCK!")
+        print(f"  🔍 Matched: {matched_indicator or 'Available indicator found'}")
+        print(f"  📢 Status: 🚨 STOCK ALERT - Notification sent!")
+        send_telegram_message(msg)
+        notified[url] = True
+    elif avail is True and prev:
+        print(f"  📦 Stock: ✅ IN STOCK")
+        print(f"  🔍 Matched: {matched_indicator or 'Available indicator found'}")
+        print(f"  📢 Status: Already notified (stock still available)")
+    elif avail is False:
+        notified[url] = False
+        print(f"  📦 Stock: ❌ OUT OF STOCK")
+        print(f"  🔍 Matched: {matched_indicator or 'Unavailable indicator found'}")
+        print(f"  📢 Status: Monitoring...")
+    else:
+        # Status unclear - show some context for debugging
+        page_text_sample = result.get("sample", "")
+        print(f"  📦 Stock: ⚠️  STATUS UNCLEAR")
+        print(f"  🔍 Looking for: {item.get('available_indicators', []) + item.get('unavailable_indicators', [])}")
+        print(f"  📝 Page sample: {page_text_sample[:100]}...")
+
+
+def show_pincodes(item, result):
+    """Print the delivery matrix and send one alert listing the pincodes whose delivery changed"""
+    name = item.get("name") or item.get("url")
+    url = item["url"]
+    now_available = []
+    now_unavailable = []
+
+    print(f"  🚚 Delivery by pincode:")
+    for pincode, r in result["pincodes"].items():
+        if r.get("error"):
+            print(f"     📍 {pincode}: ⚠️  {r['error']}")
+            continue
+        key = pincode_key(url, pincode)
+        prev = delivery_status.get(key)
+        if r["delivery_unavailable"]:
+            print(f"     📍 {pincode}: ❌ Not available")
+            if prev is not False:  # First time or changed from available
+                now_unavailable.append(pincode)
+            delivery_status[key] = False
+        else:
+            print(f"     📍 {pincode}: ✅ Available")
+            if prev is False:
+                now_available.append(pincode)
+            delivery_status[key] = True
+
+    if now_available or now_unavailable:
+        msg = f"🚚 DELIVERY UPDATE\n\n📦 Product: {name}"
+        if now_available:
+            msg += f"\n✅ Now available for pincode(s): {', '.join(now_available)}"
+        if now_unavailable:
+            msg += f"\n❌ Not available for pincode(s): {', '.join(now_unavailable)}"
+        msg += f"\n🔗 {url}"
+        print(f"  📢 Status: Delivery update sent via Telegram")
+        send_telegram_message(msg)
+
+
+def verdict_name(result):
+    """Short label for a check result (used as a metrics label)"""
+    if result.get("error"):
+        return "error"
+    if result.get("unchanged"):
+        return "unchanged"
+    if result["delivery_unavailable"]:
+        return "delivery_unavailable"
+    return {True: "in_stock", False: "out_of_stock"}.get(result["avail"], "unclear")
+
+
+def record_check(item, result):
+    """Count one check in the metrics (see metrics.py)"""
+    if not metrics.enabled:
+        return
+    verdict = verdict_name(result)
+    metrics.inc("checks_total")
+    if verdict == "error":
+        metrics.inc("check_errors_total")
+    metrics.inc("verdicts_total", verdict=verdict)
+    metrics.log_event("check", url=item["url"], verdict=verdict, matched=result.get("matched"),
+                      error=result.get("error"))
+
+
+sweep_stage_totals = {}  # Stage totals at the end of the previous sweep
+
+
+def record_sweep(count, seconds):
+    """Record one full sweep; a sweep longer than CHECK_INTERVAL_MIN counts as an overrun"""
+    global sweep_stage_totals
+    if not metrics.enabled:
+        return
+    overrun = seconds > CHECK_INTERVAL_MIN * 60
+    metrics.inc("sweeps_total")
+    if overrun:
+        metrics.inc("sweep_overruns_total")
+    metrics.set_gauge("last_sweep_seconds", round(seconds, 3))
+    metrics.set_gauge("last_sweep_items", count)
+    totals = metrics.stage_totals()
+    stages = {}
+    for name, (checks, spent) in totals.items():
+        before = sweep_stage_totals.get(name, (0, 0.0))
+        if checks > before[0]:
+            stages[name] = {"count": checks - before[0], "seconds": round(spent - before[1], 3)}
+    sweep_stage_totals = totals
+    metrics.log_event("sweep", items=count, seconds=round(seconds, 3), overrun=overrun, stages=stages)
+
+
+def print_load_stats(result):
+    """One line of network use for pages loaded in lean mode (Selenium)"""
+    stats = result.get("load_stats")
+    if stats:
+        print(f"  🪶 Page load: {stats['requests'] - stats['blocked']} requests "
+              f"({stats['blocked']} blocked), {stats['bytes'] / 1024:.0f} KB")
+
+
+def print_sweep_header(count):
+    """Print the banner that starts a sweep"""
+    print(f"\n{'='*70}")
+    print(f"📊 CHECKING {count} PRODUCT(S) - {time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"{'='*70}")
+
+
+def print_sweep_footer():
+    """Print the banner that ends a sweep"""
+    print(f"\n{'='*70}")
+    print(f"✅ CHECK COMPLETE - {time.strftime('%H:%M:%S')}")
+    print(f"{'='*70}\n")
@@ -0,0 +1,86 @@
+# croma_api against croma_api_stub.py answering from fixtures/croma_api/promise_lines.json
+import pytest
+
+import croma_api
+from croma_api_stub import start_stub_server
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    server, base_url = start_stub_server()
+    monkeypatch.setattr(croma_api, "API_BASE", base_url)
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def api_item(product_id, **fields):
+    return dict({"name": f"Product {product_id}", "url": f"https://www.croma.com/product-/p/{product_id}",
+                 "check_type": "api"}, **fields)
+
+
+def test_check_items_verdicts(stub):
+    items = [api_item("317396"), api_item("317398"), api_item("317403"), api_item("999999"),
+             {"name": "No id", "url": "https://www.croma.com/search?q=phone", "check_type": "api"}]
+    results = croma_api.check_items(items, pincode="400049")
+
+    in_stock, no_stock, unserviceable, unknown, no_id = (results[item["url"]] for item in items)
+    assert in_stock["avail"] is True and not in_stock["delivery_unavailable"]
+    assert in_stock["matched"] == "API: deliverable 2026-10-21"
+    assert no_stock["avail"] is False and not no_stock["delivery_unavailable"]
+    assert no_stock["matched"] == "API: INSUFFICIENT_INVENTORY"
+    assert unserviceable["avail"] is False and unserviceable["delivery_unavailable"]
+    assert unknown["avail"] is False and unknown["matched"] == "API: INVALID_ITEM"
+    assert "No product id" in no_id["error"]
+    assert all("latency" in result for result in results.values())
+
+
+def test_check_items_batches_requests(stub, monkeypatch):
+    monkeypatch.setattr(croma_api, "API_BATCH_SIZE", 2)
+    items = [api_item(product_id) for product_id in ("317396", "317398", "317401", "317403")]
+    results = croma_api.check_items(items, pincode="400049")
+
+    assert stub.RequestHandlerClass.requests_served == 2
+    assert [results[item["url"]]["avail"] for item in items] == [True, False, True, False]
+
+
+def test_check_matrix_uses_the_pincode_override(stub):
+    item = api_item("317401", pincodes=[400049, "110001"])
+    row = croma_api.check_matrix([item])[item["url"]]
+
+    assert set(row) == {"400049", "110001"}
+    assert row["400049"]["avail"] is True
+    assert row["110001"]["delivery_unavailable"] is True and row["110001"]["avail"] is False
+
+
+def test_matrix_result_in_stock_at_any_pincode(stub):
+    item = api_item("317401", pincodes=["400049", "110001"])
+    result = croma_api.check_items([item])[item["url"]]
+
+    assert result["avail"] is True
+    assert result["matched"] == "API: deliverable 2026-10-20"
+    assert result["delivery_unavailable"] is False  # Deliverable to 400049
+    assert set(result["pincodes"]) == {"400049", "110001"}
+
+
+def test_matrix_result_unserviceable_everywhere(stub):
+    item = api_item("317401", pincodes=["110001"])
+    result = croma_api.matrix_result(croma_api.check_matrix([item])[item["url"]])
+
+    assert result["avail"] is False
+    assert result["delivery_unavailable"] is True
+
+
+def test_matrix_result_missing_id_and_errors(stub):
+    no_id = {"name": "No id", "url": "https://www.croma.com/search?q=tv", "check_type": "api", "pincodes": ["400049"]}
+    result = croma_api.matrix_result(croma_api.check_matrix([no_id])[no_id["url"]])
+    assert "No product id" in result["error"]
+    assert croma_api.matrix_result({}) == {"error": "No pincodes"}
+
+
+def test_api_down_reports_an_error_per_item(monkeypatch):
+    monkeypatch.setattr(croma_api, "API_BASE", "http://127.0.0.1:9")
+    items = [api_item("317396"), api_item("317398")]
+    results = croma_api.check_items(items)
+
+    assert all(results[item["url"]]["error"].startswith("API request failed") for item in items)
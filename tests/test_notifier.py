@@ -0,0 +1,113 @@
+# Retry queue of notifier.TelegramDispatcher against fake_telegram_api.py
+import time
+
+import pytest
+
+import notifier
+from fake_telegram_api import start_fake_server
+
+
+@pytest.fixture(autouse=True)
+def fast_timings(monkeypatch):
+    """Shrink the rate limit, coalescing window and backoff so a test takes well under a second"""
+    monkeypatch.setattr(notifier, "CHAT_MIN_INTERVAL", 0.01)
+    monkeypatch.setattr(notifier, "COALESCE_SECONDS", 0.05)
+    monkeypatch.setattr(notifier, "BACKOFF_BASE", 0.2)
+
+
+@pytest.fixture
+def servers():
+    started = []
+
+    def start(**options):
+        server = start_fake_server(**options)
+        started.append(server)
+        return server
+
+    yield start
+    for server in started:
+        server.shutdown()
+        server.server_close()
+
+
+def dispatcher_for(server, tmp_path, base_url=None):
+    return notifier.TelegramDispatcher("TOKEN", "1", queue_file=str(tmp_path / "queue.jsonl"),
+                                       api_base=base_url or server.base_url)
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.time() + timeout
+    while not condition():
+        assert time.time() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def received(server, chat_id="1"):
+    """Texts delivered to chat_id, coalesced messages split back into their parts"""
+    texts = []
+    for _, chat, text in server.messages:
+        if chat == chat_id:
+            texts.extend(text.split(notifier.MESSAGE_SEPARATOR))
+    return texts
+
+
+def test_messages_stay_in_order_through_retries(servers, tmp_path):
+    server = servers(fail_first=2)
+    dispatcher = dispatcher_for(server, tmp_path)
+    dispatcher.enqueue("a")
+    wait_until(lambda: server.calls >= 1)
+    dispatcher.enqueue("b")
+    wait_until(lambda: server.calls >= 2)
+    dispatcher.enqueue("c")
+    wait_until(lambda: len(received(server)) == 3)
+    dispatcher.stop()
+
+    # "b" and "c" wait behind "a" while it backs off, instead of going out before it
+    assert received(server) == ["a", "b", "c"]
+    assert dispatcher.sent == 3
+
+
+def test_burst_is_coalesced_per_chat(servers, tmp_path, monkeypatch):
+    monkeypatch.setattr(notifier, "COALESCE_SECONDS", 0.3)
+    server = servers()
+    dispatcher = dispatcher_for(server, tmp_path)
+    for text in ("a", "b", "c"):
+        dispatcher.enqueue(text)
+    dispatcher.enqueue("x", chat_id="2")
+    wait_until(lambda: len(server.messages) == 2)
+    dispatcher.stop()
+
+    texts = {chat: text for _, chat, text in server.messages}
+    assert texts == {"1": notifier.MESSAGE_SEPARATOR.join(["a", "b", "c"]), "2": "x"}
+
+
+def test_rejected_batch_is_split_and_only_the_bad_message_dropped(servers, tmp_path):
+    server = servers(reject="<broken")
+    dispatcher = dispatcher_for(server, tmp_path)
+    for text in ("first", "<broken", "last"):
+        dispatcher.enqueue(text)
+    wait_until(lambda: dispatcher.sent + dispatcher.failed == 3)
+    dispatcher.stop()
+
+    assert [text for _, _, text in server.messages] == ["first", "last"]
+    assert dispatcher.failed == 1
+    assert (tmp_path / "queue.jsonl").read_text(encoding="utf-8") == ""
+
+
+def test_unsent_messages_are_reloaded_after_restart(servers, tmp_path):
+    down = servers(fail_first=1000)
+    dispatcher = dispatcher_for(down, tmp_path)
+    dispatcher.enqueue("a")
+    dispatcher.enqueue("b")
+    dispatcher.stop(timeout=0.3)
+    assert down.messages == []
+    assert len((tmp_path / "queue.jsonl").read_text(encoding="utf-8").splitlines()) == 2
+
+    up = servers()
+    restarted = dispatcher_for(up, tmp_path)
+    restarted.start()
+    restarted.stop()
+
+    assert received(up) == ["a", "b"]
+    assert restarted.pending == []
+    assert (tmp_path / "queue.jsonl").read_text(encoding="utf-8") == ""